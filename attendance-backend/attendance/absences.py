@@ -0,0 +1,129 @@
+"""
+Cached absent list.
+
+Office staff and the SMS sender ask for the same (date, class) absent
+list over and over.  The list, parent messages included, is built once
+and kept in Django's cache as ready-to-send JSON.  The cache key carries
+three version stamps (see versions.py), so nothing is ever deleted; a
+stale entry is simply never asked for again:
+
+- ``absent:<date>``: the daily rows of that date changed (finalize,
+  compaction, or a late scan correcting an 'A' row to 'P').  A
+  compacted day's absentees come from its month's registers.  Marks
+  that only add 'P' rows never invalidate.
+- ``totals``: the running totals quoted in every message changed.
+- ``students``: names, classes or parent contacts changed.
+
+The stamps only reach every worker through a shared cache, so the list
+is cached only with settings.REPORT_CACHE (on with Redis); otherwise
+every call builds it.
+"""
+
+import json
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+
+from .versions import bump_version_on_commit, get_version
+
+
+KEY_PREFIX = 'attendance:absent-list:'
+
+# Entries for superseded versions are unreachable; let them age out
+CACHE_SECONDS = 24 * 60 * 60
+
+ABSENT_MESSAGE = (
+    "Dear Parent, Your child {student_name} (Class {class_name}) was absent on {date}. "
+    "Total absences: {absent_days}. "
+    "Continuous absence: {continuous_absent} days. "
+    "Please ensure regular attendance."
+).format
+
+
+def invalidate_absent_lists(days):
+    """The daily rows of these dates changed"""
+    for day in days:
+        bump_version_on_commit(f'absent:{day.isoformat()}')
+
+
+def invalidate_totals():
+    bump_version_on_commit('totals')
+
+
+def _build(day, class_name):
+    # register.py imports this module for the invalidation helpers
+    from .register import register_day_sql
+
+    # Days of a compacted month may only be in its registers
+    pruned, pruned_params = register_day_sql(day, 'A')
+    query = f"""
+        SELECT
+            s.roll_no,
+            s.student_name,
+            s.class,
+            p.contact,
+            t.present_days,
+            t.absent_days,
+            t.continuous_absent
+        FROM student s
+        JOIN parent_detail p ON s.roll_no = p.roll_no
+        JOIN (
+            SELECT roll_no FROM daily_attendance
+            WHERE attendance_date = %s AND status = 'A'
+            UNION ALL
+            {pruned}
+        ) AS a ON s.roll_no = a.roll_no
+        LEFT JOIN total_attendance t ON s.roll_no = t.roll_no
+        WHERE true
+    """
+    params = [day, *pruned_params]
+
+    if class_name:
+        query += " AND s.class = %s"
+        params.append(class_name)
+
+    query += " ORDER BY t.continuous_absent DESC NULLS LAST"
+
+    with connection.cursor() as cursor:
+        cursor.execute(query, params)
+        rows = cursor.fetchall()
+
+    result = []
+    for roll_no, student_name, class_, contact, present_days, absent_days, continuous_absent in rows:
+        entry = {
+            "roll_no": roll_no,
+            "student_name": student_name,
+            "class_name": class_,
+            "contact": contact,
+            "present_days": present_days or 0,
+            "absent_days": absent_days or 0,
+            "continuous_absent": continuous_absent or 0,
+        }
+        entry["message"] = ABSENT_MESSAGE(date=day.isoformat(), **entry)
+        result.append(entry)
+    return result
+
+
+def absent_list_json(day, class_name=None):
+    """The absent list for a date (and class) as JSON bytes, from cache when current"""
+    if not settings.REPORT_CACHE:
+        return json.dumps(_build(day, class_name)).encode()
+
+    # Read the stamps before the rows so a concurrent change can only
+    # make this entry unreachable, never hide the change
+    key = '{}{}:{}:{}-{}-{}'.format(
+        KEY_PREFIX,
+        day.isoformat(),
+        quote(class_name) if class_name else '*',
+        get_version(f'absent:{day.isoformat()}'),
+        get_version('totals'),
+        get_version('students'),
+    )
+
+    body = cache.get(key)
+    if body is None:
+        body = json.dumps(_build(day, class_name)).encode()
+        cache.set(key, body, timeout=CACHE_SECONDS)
+    return body
@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.utils.html import format_html
-from .models import Student, ParentDetail, DailyAttendance, TotalAttendance, Device, DeviceCommand, AttendanceLog
+from .models import Student, ParentDetail, DailyAttendance, TotalAttendance, Device, DeviceCommand, AttendanceLog, FingerprintSlot, EnrollmentCampaign, ClassDailySummary, MonthlyRegister, ArchivedStudent, AttendanceArchive, TotalAttendanceArchive, SmsMessage
 
 @admin.register(Student)
 class StudentAdmin(admin.ModelAdmin):
@@ -21,7 +21,7 @@ class StudentAdmin(admin.ModelAdmin):
 
 @admin.register(Device)
 class DeviceAdmin(admin.ModelAdmin):
-    list_display = ['device_id', 'name', 'status_indicator', 'current_mode', 'last_seen']
+    list_display = ['device_id', 'name', 'status_indicator', 'current_mode', 'last_seen_at']
     list_filter = ['status', 'current_mode', 'is_active']
     readonly_fields = ['last_seen', 'created_at']
     
@@ -37,12 +37,16 @@ class DeviceAdmin(admin.ModelAdmin):
             color, text
         )
     status_indicator.short_description = 'Status'
+    
+    def last_seen_at(self, obj):
+        return obj.presence()[0]
+    last_seen_at.short_description = 'Last seen'
 
 
 @admin.register(DeviceCommand)
 class DeviceCommandAdmin(admin.ModelAdmin):
     list_display = ['id', 'device', 'student', 'command_type', 'status_badge', 'fingerprint_id', 'created_at']
-    list_filter = ['command_type', 'status', 'device']
+    list_filter = ['command_type', 'status', 'device', 'campaign']
     search_fields = ['student__student_name', 'student__roll_no']
     readonly_fields = ['created_at', 'updated_at', 'completed_at']
     
@@ -62,6 +66,21 @@ class DeviceCommandAdmin(admin.ModelAdmin):
     status_badge.short_description = 'Status'
 
 
+@admin.register(EnrollmentCampaign)
+class EnrollmentCampaignAdmin(admin.ModelAdmin):
+    list_display = ['id', 'class_name', 'device', 'created_at', 'updated_at']
+    list_filter = ['device', 'class_name']
+    readonly_fields = ['created_at', 'updated_at']
+
+
+@admin.register(FingerprintSlot)
+class FingerprintSlotAdmin(admin.ModelAdmin):
+    list_display = ['device', 'slot', 'student', 'enrolled']
+    list_filter = ['device', 'enrolled']
+    search_fields = ['student__student_name', 'student__roll_no']
+    readonly_fields = ['device', 'slot', 'student', 'enrolled']
+
+
 @admin.register(AttendanceLog)
 class AttendanceLogAdmin(admin.ModelAdmin):
     list_display = ['student', 'device', 'attendance_date', 'timestamp']
@@ -89,4 +108,50 @@ class DailyAttendanceAdmin(admin.ModelAdmin):
 class TotalAttendanceAdmin(admin.ModelAdmin):
     list_display = ['roll_no', 'present_days', 'absent_days', 'present_percentage', 'continuous_absent']
     list_filter = ['present_percentage']
-    readonly_fields = ['present_days', 'absent_days', 'continuous_absent', 'present_percentage']
\ No newline at end of file
+    readonly_fields = ['present_days', 'absent_days', 'continuous_absent', 'present_percentage']
+
+@admin.register(ClassDailySummary)
+class ClassDailySummaryAdmin(admin.ModelAdmin):
+    list_display = ['class_name', 'attendance_date', 'present', 'absent', 'enrolled']
+    list_filter = ['attendance_date', 'class_name']
+    readonly_fields = ['class_name', 'attendance_date', 'present', 'absent', 'enrolled']
+    date_hierarchy = 'attendance_date'
+
+
+@admin.register(MonthlyRegister)
+class MonthlyRegisterAdmin(admin.ModelAdmin):
+    list_display = ['roll_no', 'month', 'present_bits', 'absent_bits']
+    list_filter = ['month']
+    search_fields = ['roll_no__student_name', 'roll_no__roll_no']
+    readonly_fields = ['roll_no', 'month', 'present_bits', 'absent_bits', 'marked_bits']
+
+
+@admin.register(ArchivedStudent)
+class ArchivedStudentAdmin(admin.ModelAdmin):
+    list_display = ['roll_no', 'student_name', 'class_name', 'academic_year', 'contact']
+    list_filter = ['academic_year', 'class_name']
+    search_fields = ['roll_no', 'student_name']
+
+
+@admin.register(AttendanceArchive)
+class AttendanceArchiveAdmin(admin.ModelAdmin):
+    list_display = ['roll_no', 'class_name', 'attendance_date', 'status', 'first_scan']
+    list_filter = ['academic_year', 'class_name', 'status']
+    search_fields = ['roll_no']
+    date_hierarchy = 'attendance_date'
+
+
+@admin.register(TotalAttendanceArchive)
+class TotalAttendanceArchiveAdmin(admin.ModelAdmin):
+    list_display = ['roll_no', 'student_name', 'class_name', 'academic_year', 'present_days', 'absent_days', 'present_percentage']
+    list_filter = ['academic_year', 'class_name']
+    search_fields = ['roll_no', 'student_name']
+
+
+@admin.register(SmsMessage)
+class SmsMessageAdmin(admin.ModelAdmin):
+    list_display = ['roll_no', 'contact', 'attendance_date', 'status', 'attempts', 'next_attempt_at', 'sent_at']
+    list_filter = ['status', 'attendance_date']
+    search_fields = ['contact', 'roll_no__student_name', 'roll_no__roll_no']
+    readonly_fields = ['attempts', 'last_error', 'gateway_message_id', 'created_at', 'sent_at']
+    date_hierarchy = 'attendance_date'
@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class AttendanceConfig(AppConfig):
     name = 'attendance'
+
+    def ready(self):
+        from . import signals  # noqa: F401
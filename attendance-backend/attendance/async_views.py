@@ -0,0 +1,218 @@
+"""
+Async versions of the ESP32-facing endpoints.
+
+Served under an ASGI server these views await the database instead of
+holding a worker thread for every scanner request, so one process can
+keep hundreds of scanners connected.  They return exactly the same JSON
+as their counterparts in views.py; urls.py picks one set or the other
+from settings.SERVE_ASGI.
+
+The command status event stream exists only here: a stream stays open
+for minutes, which under WSGI would tie up a worker per open page, so
+there the frontend polls check_command_status instead.
+"""
+
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+
+from .fingerprints import fingerprint_cache
+from .models import DeviceCommand
+from .notifier import notifier
+from .presence import presence_tracker
+from .queue import claim_next_commands, record_command_result
+from .scans import clean_device_id, mark_present
+from .views import (
+    command_limit,
+    command_status_payload,
+    device_commands_response,
+    long_poll_seconds,
+)
+
+
+COMMAND_STREAM_KEEPALIVE_SECONDS = 15
+
+
+def _request_data(request):
+    """Parse a JSON or form-encoded body the way DRF's request.data does"""
+    if request.content_type == 'application/json':
+        try:
+            data = json.loads(request.body or b'{}')
+        except ValueError:
+            return {}
+        return data if isinstance(data, dict) else {}
+    return request.POST
+
+
+@csrf_exempt
+@require_POST
+async def mark_attendance(request):
+    """ESP32 calls this when fingerprint is scanned"""
+    data = _request_data(request)
+    fingerprint_id = data.get('fingerprint_id')
+
+    if not fingerprint_id:
+        return JsonResponse({
+            'error': 'fingerprint_id required'
+        }, status=400)
+
+    try:
+        device_id = clean_device_id(data.get('device_id', 'FP001'))
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    try:
+        student = await sync_to_async(fingerprint_cache.resolve)(device_id, fingerprint_id)
+    except (TypeError, ValueError):
+        return JsonResponse({
+            'error': 'fingerprint_id must be a number'
+        }, status=400)
+
+    if student is None:
+        return JsonResponse({
+            'error': f'No student found with fingerprint_id {fingerprint_id}'
+        }, status=404)
+
+    await sync_to_async(presence_tracker.touch)(device_id)
+
+    now = timezone.now()
+    timestamp = await sync_to_async(mark_present)(student.roll_no, device_id, now)
+
+    if timestamp is None:
+        return JsonResponse({
+            'message': 'Already marked present today',
+            'student': student.student_name,
+            'roll_no': student.roll_no,
+            'time': timezone.localdate(now).strftime('%Y-%m-%d')
+        })
+
+    return JsonResponse({
+        'success': True,
+        'message': 'Attendance marked successfully',
+        'student': student.student_name,
+        'roll_no': student.roll_no,
+        'class': student.class_name,
+        'timestamp': timestamp.isoformat()
+    })
+
+
+@require_GET
+async def get_device_commands(request):
+    """ESP32 polls this; ?wait=<seconds> long-polls without holding a thread"""
+    device_id = request.GET.get('device_id')
+
+    if not device_id:
+        return JsonResponse({'error': 'device_id required'}, status=400)
+
+    await sync_to_async(presence_tracker.touch)(device_id)
+
+    limit = command_limit(request)
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + long_poll_seconds(request)
+
+    with notifier.listen(f'device:{device_id}') as subscription:
+        commands = await sync_to_async(claim_next_commands)(device_id, limit or 1)
+        while not commands:
+            remaining = deadline - loop.time()
+            if remaining <= 0 or not await subscription.async_wait(remaining):
+                break
+            commands = await sync_to_async(claim_next_commands)(device_id, limit or 1)
+
+    return JsonResponse(device_commands_response(commands, limit))
+
+
+@csrf_exempt
+@require_POST
+async def update_command_status(request):
+    """ESP32 reports command completion"""
+    data = _request_data(request)
+    command_id = data.get('command_id')
+    result = data.get('status')
+    message = data.get('message', '')
+
+    if not command_id:
+        return JsonResponse({'error': 'command_id required'}, status=400)
+
+    # Slot bookkeeping needs a transaction, which the async ORM cannot open
+    try:
+        found = await sync_to_async(record_command_result)(command_id, result, message)
+    except ValueError:
+        found = False
+
+    if not found:
+        return JsonResponse({'error': 'Command not found'}, status=404)
+
+    return JsonResponse({'message': 'Status updated'})
+
+
+@csrf_exempt
+@require_POST
+async def device_status(request):
+    """ESP32 heartbeat"""
+    data = _request_data(request)
+    device_id = data.get('device_id')
+    device_status_value = data.get('status', 'online')
+    mode = data.get('mode', 'scanning')
+
+    if not device_id:
+        return JsonResponse({'error': 'device_id required'}, status=400)
+
+    await sync_to_async(presence_tracker.touch)(
+        device_id, status=device_status_value, mode=mode
+    )
+
+    return JsonResponse({'message': 'Status updated'}, status=200)
+
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def sse_response(events):
+    response = StreamingHttpResponse(events, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # keep proxies from buffering the stream
+    return response
+
+
+async def _command_status_events(command_id):
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + settings.COMMAND_STREAM_MAX_SECONDS
+    last_payload = None
+
+    with notifier.listen(f'command:{command_id}') as subscription:
+        while True:
+            command = await DeviceCommand.objects.select_related('student').filter(id=command_id).afirst()
+            if command is None:
+                yield sse_event('error', {'error': 'Command not found'})
+                return
+
+            payload = command_status_payload(command)
+            if payload != last_payload:
+                yield sse_event('status', payload)
+                last_payload = payload
+
+            if command.status in DeviceCommand.FINISHED_STATUSES:
+                return
+
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return
+
+            if not await subscription.async_wait(min(remaining, COMMAND_STREAM_KEEPALIVE_SECONDS)):
+                yield ': keepalive\n\n'
+
+
+@require_GET
+async def stream_command_status(request, command_id):
+    """Server-sent events for each status change of a command"""
+    if not await DeviceCommand.objects.filter(id=command_id).aexists():
+        return JsonResponse({'error': 'Command not found'}, status=404)
+
+    return sse_response(_command_status_events(command_id))
@@ -0,0 +1,70 @@
+"""
+Class-wide enrollment campaigns.
+
+Enrolling a new intake one click at a time queues one command per click
+and the scanner picks them up one poll at a time.  A campaign reserves
+slots for every unenrolled student of a class in one go and queues the
+whole batch with a single bulk_create; the scanner then fetches several
+commands per poll (``?limit=``) and works through them in one session.
+"""
+
+from django.db import transaction
+from django.db.models import Count, Q
+
+from .models import Device, DeviceCommand, EnrollmentCampaign, Student
+from .notifier import notifier
+from .slots import claim_slots
+
+
+def unenrolled_students(device_id, class_name):
+    """Students of a class with no slot (enrolled or reserved) on the device"""
+    return Student.objects.filter(class_name=class_name).exclude(
+        fingerprint_slots__device_id=device_id
+    ).order_by('roll_no')
+
+
+def start_campaign(device, class_name):
+    """
+    Reserve slots and queue enroll commands for a class, in roll number
+    order.  Returns (campaign, queued, skipped) where skipped lists the
+    roll numbers that did not fit on the sensor; campaign is None when
+    no command could be queued.
+    """
+    with transaction.atomic():
+        # One campaign start per device at a time, so two starts for the
+        # same class cannot both see a student as unenrolled and give
+        # them two slots
+        Device.objects.select_for_update().filter(pk=device.pk).exists()
+        students = list(unenrolled_students(device.device_id, class_name))
+        slots = claim_slots(device.device_id, students)
+        if not slots:
+            return None, 0, [s.roll_no for s in students]
+
+        campaign = EnrollmentCampaign.objects.create(device=device, class_name=class_name)
+        DeviceCommand.objects.bulk_create([
+            DeviceCommand(
+                device=device,
+                student=student,
+                command_type='enroll',
+                fingerprint_id=slots[student.pk],
+                campaign=campaign,
+                status='pending'
+            )
+            for student in students if student.pk in slots
+        ])
+        notifier.publish(f'device:{device.device_id}')
+
+    return campaign, len(slots), [s.roll_no for s in students if s.pk not in slots]
+
+
+def campaign_progress(campaign):
+    """Command counts per status for a campaign, from one aggregate query"""
+    counts = campaign.commands.aggregate(
+        total=Count('id'),
+        **{
+            status: Count('id', filter=Q(status=status))
+            for status, _ in DeviceCommand.STATUS_CHOICES
+        }
+    )
+    counts['finished'] = counts['pending'] + counts['in_progress'] == 0
+    return counts
@@ -0,0 +1,121 @@
+"""
+Attendance register export.
+
+A register is one line per student and one column per school day.  The
+export streams it as CSV straight off a single chunked cursor over
+daily_attendance, ordered so that a student's marks arrive together:
+each line is written out as soon as the next student starts, so the
+first bytes leave at once and memory stays flat whether the export is a
+week of one class or a year of the whole school.
+
+Compacted months (see register.py) may have lost their daily rows; their
+registers, one small row per student and month, are read up front and
+fill the days that have no daily row.
+"""
+
+import csv
+from collections import defaultdict
+from datetime import timedelta
+from itertools import groupby
+
+from django.conf import settings
+from django.db import connection
+
+from .models import MonthlyRegister
+from .register import marked_days, month_start
+
+
+# Rows per round trip from the server-side cursor
+FETCH_SIZE = 2000
+
+# A full school year, leap day included
+MAX_EXPORT_DAYS = 366
+
+
+class _Echo:
+    """File-like object whose write() hands the line back to csv.writer"""
+
+    def write(self, value):
+        return value
+
+
+def school_days(start, end):
+    """Dates from start to end that fall on a school weekday"""
+    days = []
+    day = start
+    while day <= end:
+        if day.weekday() in settings.SCHOOL_WEEKDAYS:
+            days.append(day)
+        day += timedelta(days=1)
+    return days
+
+
+def _register_rows(start, end, class_name):
+    """(class, roll_no, student_name, attendance_date, status) ordered by student"""
+    query = """
+        SELECT s.class, s.roll_no, s.student_name, d.attendance_date, d.status
+        FROM student s
+        LEFT JOIN daily_attendance d
+            ON d.roll_no = s.roll_no
+           AND d.attendance_date BETWEEN %s AND %s
+    """
+    params = [start, end]
+
+    if class_name:
+        query += " WHERE s.class = %s"
+        params.append(class_name)
+
+    query += " ORDER BY s.class, s.roll_no"
+
+    # A named (server-side) cursor on PostgreSQL, fetchmany() elsewhere
+    with connection.chunked_cursor() as cursor:
+        cursor.execute(query, params)
+        while True:
+            rows = cursor.fetchmany(FETCH_SIZE)
+            if not rows:
+                return
+            yield from rows
+
+
+def _registers(start, end, class_name):
+    """{roll_no: [(month, present_bits, marked_bits), ...]} for the compacted months in range"""
+    registers = MonthlyRegister.objects.filter(month__range=(month_start(start), end))
+    if class_name:
+        registers = registers.filter(roll_no__class_name=class_name)
+
+    by_student = defaultdict(list)
+    for roll_no, month, present, marked in registers.values_list(
+        'roll_no', 'month', 'present_bits', 'marked_bits'
+    ):
+        by_student[roll_no].append((month, present, marked))
+    return by_student
+
+
+def register_csv(start, end, class_name=None):
+    """Generate the register for a date range as CSV lines"""
+    days = school_days(start, end)
+    columns = {day.isoformat(): n for n, day in enumerate(days)}
+    writer = csv.writer(_Echo())
+
+    yield writer.writerow(
+        ['Class', 'Roll No', 'Student Name', *columns, 'Present', 'Absent']
+    )
+
+    registers = _registers(start, end, class_name)
+    rows = _register_rows(start, end, class_name)
+    for (class_, roll_no, student_name), marks in groupby(rows, key=lambda r: r[:3]):
+        cells = [''] * len(days)
+        for *_, attendance_date, status in marks:
+            # SQLite returns dates as text
+            n = columns.get(str(attendance_date)) if attendance_date else None
+            if n is not None:
+                cells[n] = status
+        # A daily row wins over the register for its day
+        for month, present, marked in registers.get(roll_no, ()):
+            for day in marked_days(marked):
+                n = columns.get((month + timedelta(days=day - 1)).isoformat())
+                if n is not None and not cells[n]:
+                    cells[n] = 'P' if present >> (day - 1) & 1 else 'A'
+        yield writer.writerow([
+            class_, roll_no, student_name, *cells, cells.count('P'), cells.count('A')
+        ])
@@ -0,0 +1,104 @@
+"""
+In-process (device_id, fingerprint_id) -> student resolution cache.
+
+Every scan needs to turn the device's sensor slot into a student, but
+that mapping only changes when a fingerprint is enrolled or deleted.
+Each worker keeps the whole map in memory and reloads it when the shared
+version stamp moves (see versions.py), so the scan path does no student
+lookups.
+"""
+
+import threading
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+
+from .models import FingerprintSlot
+from .versions import bump_version, get_version
+
+
+VERSION_NAME = 'fingerprints'
+
+# A miss on an unknown fingerprint may mean another worker just enrolled it
+MISS_RELOAD_SECONDS = 5
+
+StudentRef = namedtuple('StudentRef', ['roll_no', 'student_name', 'class_name'])
+
+
+class FingerprintCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._map = None
+        self._version = None
+        self._loaded_at = 0.0
+
+    def _load(self, version):
+        rows = FingerprintSlot.objects.filter(
+            enrolled=True, student__isnull=False
+        ).values_list(
+            'device_id', 'slot',
+            'student__roll_no', 'student__student_name', 'student__class_name'
+        )
+
+        self._map = {(row[0], row[1]): StudentRef(*row[2:]) for row in rows}
+        self._version = version
+        self._loaded_at = time.monotonic()
+
+    def _is_stale(self, version, max_age):
+        return (
+            self._map is None
+            or self._version != version
+            or time.monotonic() - self._loaded_at > max_age
+        )
+
+    def _current(self, max_age=None):
+        if max_age is None:
+            max_age = settings.FINGERPRINT_CACHE_MAX_AGE
+
+        # Read the stamp before loading so a bump during the load is not lost
+        version = get_version(VERSION_NAME)
+        if self._is_stale(version, max_age):
+            with self._lock:
+                if self._is_stale(version, max_age):
+                    self._load(version)
+        return self._map
+
+    def resolve(self, device_id, fingerprint_id):
+        """Return the StudentRef for a slot on a device, or None"""
+        key = (device_id, int(fingerprint_id))
+        student = self._current().get(key)
+        if student is None:
+            student = self._current(max_age=MISS_RELOAD_SECONDS).get(key)
+        return student
+
+    def resolve_many(self, keys):
+        """Return {(device_id, fingerprint_id): StudentRef} for the known keys"""
+        keys = {(device_id, int(f)) for device_id, f in keys}
+        mapping = self._current()
+        if not keys <= mapping.keys():
+            mapping = self._current(max_age=MISS_RELOAD_SECONDS)
+        return {k: mapping[k] for k in keys if k in mapping}
+
+    def invalidate(self):
+        """Drop this worker's copy and tell the others to reload theirs"""
+        with self._lock:
+            self._map = None
+        bump_version(VERSION_NAME)
+
+
+fingerprint_cache = FingerprintCache()
+
+
+def invalidate_fingerprint_cache():
+    # Other workers must not reload before the change is visible to them
+    transaction.on_commit(fingerprint_cache.invalidate)
+
+
+def warm_fingerprint_cache():
+    """Load the map at startup; a missing table (before migrate) is fine"""
+    try:
+        fingerprint_cache.resolve_many([])
+    except DatabaseError:
+        pass
@@ -0,0 +1,159 @@
+"""
+Per-student attendance history.
+
+A history is built month by month.  Each month block holds the
+student's daily statuses with their first-scan times and the month's
+counts; it is read with index range scans on (roll_no, attendance_date)
+over daily_attendance and the attendance log, plus the month's register
+row when the month has been compacted (see register.py).
+
+Blocks of closed months are kept in Django's cache under the month's
+version stamp, so a parent-teacher evening pulling dozens of year-long
+histories only reads the current month from the database.  Anything
+that rewrites a closed month's daily rows calls register.invalidate_months().
+The stamps only reach every worker through a shared cache, so blocks are
+cached only with settings.REPORT_CACHE (on with Redis).
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Min
+from django.utils import timezone
+
+from .models import AttendanceLog, DailyAttendance, MonthlyRegister
+from .register import marked_days, month_end, month_label, month_start
+from .versions import get_version
+
+
+KEY_PREFIX = 'attendance:history:'
+
+CACHE_SECONDS = 7 * 24 * 60 * 60
+
+# Longest ?from=&to= span
+MAX_HISTORY_DAYS = 366
+
+
+def _percentage(present, absent):
+    return round(100 * present / (present + absent), 2) if present + absent else 0
+
+
+def _months(start, end):
+    month = month_start(start)
+    while month <= end:
+        yield month
+        month = month_end(month) + timedelta(days=1)
+
+
+def _key(roll_no, month):
+    label = month_label(month)
+    return f'{KEY_PREFIX}{roll_no}:{label}:{get_version(f"month:{label}")}'
+
+
+def _build_blocks(roll_no, months):
+    """Month blocks for consecutive months, from three range queries"""
+    start, end = months[0], month_end(months[-1])
+
+    statuses = dict(
+        DailyAttendance.objects.filter(
+            roll_no=roll_no, attendance_date__range=(start, end)
+        ).values_list('attendance_date', 'status')
+    )
+
+    # Compacted months have no daily rows left; their registers fill in
+    for register in MonthlyRegister.objects.filter(roll_no=roll_no, month__range=(start, end)):
+        for day in marked_days(register.marked_bits):
+            date_ = register.month + timedelta(days=day - 1)
+            statuses.setdefault(date_, 'P' if register.present_bits >> (day - 1) & 1 else 'A')
+
+    first_scans = dict(
+        AttendanceLog.objects.filter(
+            student_id=roll_no, attendance_date__range=(start, end)
+        ).order_by().values('attendance_date').annotate(
+            first_scan=Min('timestamp')
+        ).values_list('attendance_date', 'first_scan')
+    )
+
+    blocks = {month: {'days': [], 'present': 0, 'absent': 0} for month in months}
+    for date_ in sorted(statuses):
+        block = blocks[month_start(date_)]
+        status = statuses[date_]
+        first_scan = first_scans.get(date_)
+        block['days'].append((
+            date_.isoformat(),
+            status,
+            timezone.localtime(first_scan).strftime('%H:%M:%S') if first_scan else None,
+        ))
+        block['present' if status == 'P' else 'absent'] += 1
+    return blocks
+
+
+def month_blocks(roll_no, start, end):
+    """{month: block} for every month from start to end, from cache where closed"""
+    months = list(_months(start, end))
+    if not settings.REPORT_CACHE:
+        return _build_blocks(roll_no, months)
+
+    current = month_start(timezone.localdate())
+    keys = {month: _key(roll_no, month) for month in months if month < current}
+
+    cached = cache.get_many(keys.values())
+    blocks = {month: cached[key] for month, key in keys.items() if key in cached}
+
+    missing = [month for month in months if month not in blocks]
+    if missing:
+        # One span covers the gaps; cached months inside it are simply rebuilt
+        span = [month for month in months if missing[0] <= month <= missing[-1]]
+        built = _build_blocks(roll_no, span)
+        cache.set_many(
+            {keys[month]: built[month] for month in missing if month in keys},
+            timeout=CACHE_SECONDS
+        )
+        blocks.update(built)
+
+    return {month: blocks[month] for month in months}
+
+
+def student_history(student, start, end):
+    """Daily statuses, first scans and running percentage from start to end"""
+    blocks = month_blocks(student.roll_no, start, end)
+    first, last = start.isoformat(), end.isoformat()
+
+    days = []
+    present = absent = 0
+    for block in blocks.values():
+        for date_, status, first_scan in block['days']:
+            if not first <= date_ <= last:
+                continue
+            if status == 'P':
+                present += 1
+            else:
+                absent += 1
+            days.append({
+                'date': date_,
+                'status': status,
+                'first_scan': first_scan,
+                'running_percentage': _percentage(present, absent),
+            })
+
+    return {
+        'roll_no': student.roll_no,
+        'student_name': student.student_name,
+        'class_name': student.class_name,
+        'from': first,
+        'to': last,
+        'present_days': present,
+        'absent_days': absent,
+        'present_percentage': _percentage(present, absent),
+        'months': [
+            {
+                'month': month_label(month),
+                'present_days': block['present'],
+                'absent_days': block['absent'],
+                'present_percentage': _percentage(block['present'], block['absent']),
+            }
+            for month, block in blocks.items()
+        ],
+        'days': days,
+    }
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from attendance.register import CompactedMonthError
+from attendance.totals import backfill_absent_streaks
+
+
+class Command(BaseCommand):
+    help = "Recompute every student's continuous_absent streak from the attendance history"
+
+    def handle(self, *args, **options):
+        try:
+            updated = backfill_absent_streaks()
+        except CompactedMonthError as e:
+            raise CommandError(str(e))
+        self.stdout.write(f"Updated absence streaks for {updated} student(s)")
@@ -0,0 +1,46 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from attendance.register import compact_month, expand_month, prune_month
+
+
+def _month(value):
+    try:
+        return datetime.strptime(value, '%Y-%m').date()
+    except ValueError:
+        raise CommandError(f"Months must be YYYY-MM, not {value!r}")
+
+
+class Command(BaseCommand):
+    help = "Fold months of daily attendance into per-student monthly register bitmaps"
+
+    def add_arguments(self, parser):
+        parser.add_argument('months', nargs='+', help="Months to compact (YYYY-MM)")
+        parser.add_argument(
+            '--prune',
+            action='store_true',
+            help="Delete the compacted daily_attendance rows afterwards"
+        )
+        parser.add_argument(
+            '--expand',
+            action='store_true',
+            help="Restore daily_attendance rows from the registers and drop the registers instead"
+        )
+
+    def handle(self, *args, **options):
+        for month in map(_month, options['months']):
+            label = month.strftime('%Y-%m')
+
+            if options['expand']:
+                restored = expand_month(month)
+                self.stdout.write(f"{label}: restored {restored} daily row(s)")
+                continue
+
+            with transaction.atomic():
+                compacted = compact_month(month)
+                pruned = prune_month(month) if options['prune'] else 0
+            self.stdout.write(
+                f"{label}: {compacted} register row(s), pruned {pruned} daily row(s)"
+            )
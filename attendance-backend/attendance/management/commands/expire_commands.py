@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from attendance.queue import expire_stale_commands
+
+
+class Command(BaseCommand):
+    help = "Expire device commands that have been pending or in progress for too long"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=0,
+            help="Keep running and sweep every N seconds (default: sweep once)"
+        )
+
+    def handle(self, *args, **options):
+        interval = options['interval']
+
+        while True:
+            expired = expire_stale_commands()
+            if expired or not interval:
+                self.stdout.write(f"Expired {expired} command(s)")
+            if not interval:
+                break
+            time.sleep(interval)
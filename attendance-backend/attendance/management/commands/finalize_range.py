@@ -0,0 +1,68 @@
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from attendance.models import Student
+from attendance.register import CompactedMonthError
+from attendance.totals import finalize_range
+
+
+def _finalize_class(start, end, class_name):
+    return class_name, finalize_range(start, end, class_name)
+
+
+class Command(BaseCommand):
+    help = "Finalize attendance for every school day in a date range"
+
+    def add_arguments(self, parser):
+        parser.add_argument('start', help="First day to finalize (YYYY-MM-DD)")
+        parser.add_argument('end', nargs='?', help="Last day to finalize (default: today)")
+        parser.add_argument(
+            '--class',
+            dest='classes',
+            action='append',
+            help="Only finalize this class (repeatable; default: every class)"
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help="Finalize classes in this many parallel processes (default: 1)"
+        )
+
+    def handle(self, *args, **options):
+        start = parse_date(options['start'])
+        end = parse_date(options['end']) if options['end'] else timezone.localdate()
+        if start is None or end is None:
+            raise CommandError("Dates must be YYYY-MM-DD")
+        if start > end:
+            raise CommandError("start must not be after end")
+
+        workers = options['workers']
+        classes = options['classes']
+        if classes is None and workers > 1:
+            classes = list(Student.objects.values_list('class_name', flat=True).distinct())
+
+        try:
+            self._finalize(start, end, classes, workers)
+        except CompactedMonthError as e:
+            raise CommandError(str(e))
+
+    def _finalize(self, start, end, classes, workers):
+        if not classes:
+            absent, updated = finalize_range(start, end)
+            self.stdout.write(f"Marked {absent} absence(s), updated {updated} student(s)")
+            return
+
+        # Children must not share the parent's database connection
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=workers, initializer=connections.close_all) as pool:
+            jobs = [pool.submit(_finalize_class, start, end, c) for c in classes]
+            for job in jobs:
+                class_name, (absent, updated) = job.result()
+                self.stdout.write(
+                    f"{class_name}: marked {absent} absence(s), updated {updated} student(s)"
+                )
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from attendance.roster import import_roster
+
+
+class Command(BaseCommand):
+    help = "Import students and parent details from a CSV roster, all or nothing"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV with roll_no, student_name, class_name, parent_name, contact[, address]")
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help="Validate every row without writing anything"
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['path'], encoding='utf-8-sig', newline='') as stream:
+                report = import_roster(stream, dry_run=options['dry_run'])
+        except (OSError, UnicodeDecodeError) as e:
+            raise CommandError(f"Cannot read {options['path']}: {e}")
+
+        for error in report['errors']:
+            roll_no = f" (roll_no {error['roll_no']})" if error['roll_no'] is not None else ''
+            self.stderr.write(f"line {error['line']}{roll_no}: {'; '.join(error['errors'])}")
+        if report['error_count'] > len(report['errors']):
+            self.stderr.write(f"... {report['error_count'] - len(report['errors'])} more rejected row(s)")
+
+        if report['error_count']:
+            raise CommandError(
+                f"{report['error_count']} problem(s) in {options['path']}; nothing imported"
+            )
+        if report['committed']:
+            self.stdout.write(f"Imported {report['created']} student(s)")
+        else:
+            self.stdout.write(f"{report['rows']} row(s) valid; nothing written")
@@ -0,0 +1,65 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from attendance.rollover import RolloverError, rollover_year
+
+
+class Command(BaseCommand):
+    help = "Close an academic year: archive its attendance, remove leavers and promote every class"
+
+    def add_arguments(self, parser):
+        parser.add_argument('year_end', help="Last day of the academic year (YYYY-MM-DD)")
+        parser.add_argument('--label', help="Archive label (default: e.g. 2025-26 for a year ending in 2026)")
+        parser.add_argument(
+            '--final-grade',
+            type=int,
+            default=12,
+            help="Classes of this grade leave instead of moving up (default: 12)"
+        )
+        parser.add_argument(
+            '--map',
+            dest='map_path',
+            help='JSON file {"old class": "new class" or null for leavers}, overriding the grade rule'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help="Run everything and report the counts, then roll back"
+        )
+
+    def handle(self, *args, **options):
+        year_end = parse_date(options['year_end'])
+        if year_end is None:
+            raise CommandError("year_end must be YYYY-MM-DD")
+
+        promotions = None
+        if options['map_path']:
+            try:
+                with open(options['map_path']) as f:
+                    promotions = json.load(f)
+            except (OSError, ValueError) as e:
+                raise CommandError(f"Cannot read {options['map_path']}: {e}")
+            if not isinstance(promotions, dict):
+                raise CommandError("The mapping must be a JSON object")
+
+        try:
+            result = rollover_year(
+                year_end,
+                promotions=promotions,
+                final_grade=options['final_grade'],
+                label=options['label'],
+                dry_run=options['dry_run']
+            )
+        except RolloverError as e:
+            raise CommandError(str(e))
+
+        for old, new in sorted(result['promotions'].items()):
+            self.stdout.write(f"  {old} -> {new or '(leaves)'}")
+        self.stdout.write(
+            f"{result['academic_year']}: archived {result['attendance_archived']} mark(s) and "
+            f"{result['totals_archived']} total(s), removed {result['leavers']} leaver(s), "
+            f"promoted {result['promoted']} student(s)"
+            + (" (dry run, rolled back)" if options['dry_run'] else "")
+        )
@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from attendance.outbox import OutboxWorker
+
+
+class Command(BaseCommand):
+    help = "Send queued parent SMS from the outbox, with retries and the gateway's rate limit"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=0,
+            help="Keep running and check the outbox every N seconds when it is empty (default: drain once)"
+        )
+
+    def handle(self, *args, **options):
+        interval = options['interval']
+        worker = OutboxWorker()
+
+        try:
+            while True:
+                sent, retrying, failed = worker.send_batch()
+                if sent or retrying or failed:
+                    self.stdout.write(f"Sent {sent}, retrying {retrying}, failed {failed}")
+                    continue
+                if not interval:
+                    break
+                time.sleep(interval)
+        finally:
+            worker.close()
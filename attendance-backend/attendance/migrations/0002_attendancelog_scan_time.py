@@ -0,0 +1,24 @@
+# Generated by Django 5.0.6 on 2026-10-18 17:17
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='attendancelog',
+            name='attendance_date',
+            field=models.DateField(default=django.utils.timezone.localdate),
+        ),
+        migrations.AlterField(
+            model_name='attendancelog',
+            name='timestamp',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.0.6 on 2026-10-18 17:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0002_attendancelog_scan_time'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='devicecommand',
+            index=models.Index(fields=['device', 'status', 'created_at'], name='devicecommand_queue_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='devicecommand',
+            index=models.Index(fields=['status', 'created_at'], name='devicecommand_status_idx'),
+        ),
+    ]
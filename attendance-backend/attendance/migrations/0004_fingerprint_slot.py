@@ -0,0 +1,70 @@
+# Generated by Django 5.0.6 on 2026-10-18 17:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def create_device_slots(apps, schema_editor):
+    """
+    Give every existing device its slot table.  Slots were allocated
+    globally before, so each student's fingerprint_id is kept reserved on
+    every device, and unfinished enroll commands keep their slot.
+    """
+    Device = apps.get_model('attendance', 'Device')
+    Student = apps.get_model('attendance', 'Student')
+    DeviceCommand = apps.get_model('attendance', 'DeviceCommand')
+    FingerprintSlot = apps.get_model('attendance', 'FingerprintSlot')
+
+    holders = {
+        fingerprint_id: (roll_no, enrolled)
+        for roll_no, fingerprint_id, enrolled in Student.objects.filter(
+            fingerprint_id__isnull=False
+        ).values_list('roll_no', 'fingerprint_id', 'fingerprint_enrolled')
+    }
+
+    pending = {}
+    for device_id, fingerprint_id, roll_no in DeviceCommand.objects.filter(
+        command_type='enroll', status__in=['pending', 'in_progress']
+    ).values_list('device_id', 'fingerprint_id', 'student_id'):
+        pending[(device_id, fingerprint_id)] = roll_no
+
+    for device_id in Device.objects.values_list('device_id', flat=True):
+        slots = []
+        for n in range(1, 128):
+            roll_no, enrolled = holders.get(n, (pending.get((device_id, n)), False))
+            slots.append(FingerprintSlot(device_id=device_id, slot=n, student_id=roll_no, enrolled=enrolled))
+        FingerprintSlot.objects.bulk_create(slots)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0003_devicecommand_queue_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='student',
+            name='fingerprint_id',
+            field=models.IntegerField(blank=True, db_index=True, help_text='ID stored in fingerprint sensor (1-127); per-device slots are in FingerprintSlot', null=True),
+        ),
+        migrations.CreateModel(
+            name='FingerprintSlot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('slot', models.PositiveSmallIntegerField(help_text='Fingerprint ID in sensor (1-127)')),
+                ('enrolled', models.BooleanField(default=False, help_text='True once the device confirmed the template is stored')),
+                ('device', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='slots', to='attendance.device')),
+                ('student', models.ForeignKey(blank=True, db_column='roll_no', help_text='Holder of the slot, reserved as soon as an enroll command is queued', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='fingerprint_slots', to='attendance.student')),
+            ],
+            options={
+                'db_table': 'fingerprint_slot',
+                'indexes': [models.Index(condition=models.Q(('student__isnull', True)), fields=['device', 'slot'], name='fingerprint_slot_free_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='fingerprintslot',
+            constraint=models.UniqueConstraint(fields=('device', 'slot'), name='fingerprint_slot_unique'),
+        ),
+        migrations.RunPython(create_device_slots, migrations.RunPython.noop),
+    ]
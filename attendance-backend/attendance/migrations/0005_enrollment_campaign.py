@@ -0,0 +1,34 @@
+# Generated by Django 5.0.6 on 2026-10-18 17:29
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0004_fingerprint_slot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EnrollmentCampaign',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('class_name', models.CharField(max_length=50)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True, help_text="Last progress report; the campaign's commands expire TTL seconds after it")),
+                ('device', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='campaigns', to='attendance.device')),
+            ],
+            options={
+                'verbose_name': 'Enrollment Campaign',
+                'verbose_name_plural': 'Enrollment Campaigns',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='devicecommand',
+            name='campaign',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='commands', to='attendance.enrollmentcampaign'),
+        ),
+    ]
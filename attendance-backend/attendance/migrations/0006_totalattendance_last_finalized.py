@@ -0,0 +1,57 @@
+# Generated by Django 5.0.6 on 2026-10-18 17:32
+
+from django.db import migrations, models
+from django.db.models import Count, Max, Q
+
+
+def recount_existing_totals(apps, schema_editor):
+    """
+    Finalize used to recompute the counters from the full history, so
+    make existing rows consistent with that history and record how far
+    it goes; incremental finalize picks up from there.
+    """
+    DailyAttendance = apps.get_model('attendance', 'DailyAttendance')
+    TotalAttendance = apps.get_model('attendance', 'TotalAttendance')
+
+    history = {
+        row['roll_no']: row
+        for row in DailyAttendance.objects.values('roll_no').annotate(
+            present=Count('pk', filter=Q(status='P')),
+            absent=Count('pk', filter=Q(status='A')),
+            last=Max('attendance_date'),
+        )
+    }
+
+    totals = []
+    for total in TotalAttendance.objects.all():
+        row = history.get(total.roll_no_id)
+        if row is None:
+            continue
+        total.present_days = row['present']
+        total.absent_days = row['absent']
+        days = row['present'] + row['absent']
+        total.present_percentage = round(100 * row['present'] / days, 2) if days else 0
+        total.last_finalized = row['last']
+        totals.append(total)
+
+    TotalAttendance.objects.bulk_update(
+        totals,
+        ['present_days', 'absent_days', 'present_percentage', 'last_finalized'],
+        batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0005_enrollment_campaign'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='totalattendance',
+            name='last_finalized',
+            field=models.DateField(blank=True, help_text='Daily rows up to this date are included in the counters', null=True),
+        ),
+        migrations.RunPython(recount_existing_totals, migrations.RunPython.noop),
+    ]
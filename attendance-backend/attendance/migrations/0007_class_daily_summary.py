@@ -0,0 +1,60 @@
+# Generated by Django 5.0.6 on 2026-10-18 17:35
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def summarize_history(apps, schema_editor):
+    """Count the existing daily_attendance rows per class and day"""
+    DailyAttendance = apps.get_model('attendance', 'DailyAttendance')
+    Student = apps.get_model('attendance', 'Student')
+    ClassDailySummary = apps.get_model('attendance', 'ClassDailySummary')
+
+    enrolled = dict(
+        Student.objects.values('class_name').annotate(n=Count('pk')).values_list('class_name', 'n')
+    )
+    rows = DailyAttendance.objects.values('roll_no__class_name', 'attendance_date').annotate(
+        present=Count('pk', filter=Q(status='P')),
+        absent=Count('pk', filter=Q(status='A')),
+    )
+    ClassDailySummary.objects.bulk_create([
+        ClassDailySummary(
+            class_name=row['roll_no__class_name'],
+            attendance_date=row['attendance_date'],
+            present=row['present'],
+            absent=row['absent'],
+            enrolled=enrolled.get(row['roll_no__class_name'], 0),
+        )
+        for row in rows
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0006_totalattendance_last_finalized'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='student',
+            name='class_name',
+            field=models.CharField(db_column='class', db_index=True, max_length=10),
+        ),
+        migrations.CreateModel(
+            name='ClassDailySummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('class_name', models.CharField(max_length=10)),
+                ('attendance_date', models.DateField(db_index=True)),
+                ('present', models.IntegerField(default=0)),
+                ('absent', models.IntegerField(default=0)),
+                ('enrolled', models.IntegerField(default=0, help_text='Students in the class when the day was last counted')),
+            ],
+            options={
+                'db_table': 'class_daily_summary',
+                'unique_together': {('class_name', 'attendance_date')},
+            },
+        ),
+        migrations.RunPython(summarize_history, migrations.RunPython.noop),
+    ]
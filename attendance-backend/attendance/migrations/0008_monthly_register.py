@@ -0,0 +1,29 @@
+# Generated by Django 5.0.6 on 2026-10-18 17:36
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0007_class_daily_summary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlyRegister',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(help_text='First day of the month')),
+                ('present_bits', models.IntegerField(default=0)),
+                ('absent_bits', models.IntegerField(default=0)),
+                ('marked_bits', models.IntegerField(default=0, help_text='Days with any daily_attendance row')),
+                ('roll_no', models.ForeignKey(db_column='roll_no', on_delete=django.db.models.deletion.CASCADE, to='attendance.student')),
+            ],
+            options={
+                'db_table': 'monthly_register',
+                'unique_together': {('roll_no', 'month')},
+            },
+        ),
+    ]
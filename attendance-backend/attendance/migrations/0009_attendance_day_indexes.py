@@ -0,0 +1,21 @@
+# Generated by Django 5.0.6 on 2026-10-18 17:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0008_monthly_register'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='attendancelog',
+            index=models.Index(fields=['student', 'attendance_date'], name='attendancelog_day_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dailyattendance',
+            index=models.Index(fields=['attendance_date', 'status'], name='daily_attendance_day_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.0.6 on 2026-10-18 17:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0009_attendance_day_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='attendancelog',
+            index=models.Index(fields=['-timestamp'], name='attendancelog_recent_idx'),
+        ),
+    ]
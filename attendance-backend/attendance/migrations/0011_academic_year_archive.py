@@ -0,0 +1,65 @@
+# Generated by Django 5.0.6 on 2026-10-18 17:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0010_attendancelog_recent_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedStudent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('academic_year', models.CharField(help_text='e.g. 2025-26', max_length=9)),
+                ('roll_no', models.IntegerField()),
+                ('student_name', models.CharField(max_length=100)),
+                ('class_name', models.CharField(db_column='class', max_length=10)),
+                ('parent_name', models.CharField(blank=True, max_length=100, null=True)),
+                ('contact', models.CharField(blank=True, max_length=15, null=True)),
+                ('address', models.CharField(blank=True, max_length=255, null=True)),
+            ],
+            options={
+                'db_table': 'archived_student',
+                'unique_together': {('academic_year', 'roll_no')},
+            },
+        ),
+        migrations.CreateModel(
+            name='AttendanceArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('academic_year', models.CharField(max_length=9)),
+                ('roll_no', models.IntegerField()),
+                ('class_name', models.CharField(db_column='class', max_length=10)),
+                ('attendance_date', models.DateField()),
+                ('status', models.CharField(max_length=1)),
+                ('first_scan', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'db_table': 'attendance_archive',
+                'indexes': [models.Index(fields=['academic_year', 'class_name'], name='attendance_archive_year_idx')],
+                'unique_together': {('roll_no', 'attendance_date')},
+            },
+        ),
+        migrations.CreateModel(
+            name='TotalAttendanceArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('academic_year', models.CharField(max_length=9)),
+                ('roll_no', models.IntegerField()),
+                ('student_name', models.CharField(max_length=100)),
+                ('class_name', models.CharField(db_column='class', max_length=10)),
+                ('present_days', models.IntegerField(default=0)),
+                ('absent_days', models.IntegerField(default=0)),
+                ('continuous_absent', models.IntegerField(default=0)),
+                ('present_percentage', models.DecimalField(decimal_places=2, default=0.0, max_digits=5)),
+            ],
+            options={
+                'db_table': 'total_attendance_archive',
+                'unique_together': {('academic_year', 'roll_no')},
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.0.6 on 2026-10-18 17:52
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0011_academic_year_archive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SmsMessage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('attendance_date', models.DateField(db_index=True, help_text='Day the notice is about')),
+                ('contact', models.CharField(max_length=15)),
+                ('body', models.TextField()),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('sending', 'Sending'), ('sent', 'Sent'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now, help_text='Earliest next send; while sending, when the claim lapses')),
+                ('last_error', models.TextField(blank=True)),
+                ('gateway_message_id', models.CharField(blank=True, max_length=100)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('sent_at', models.DateTimeField(blank=True, null=True)),
+                ('roll_no', models.ForeignKey(db_column='roll_no', on_delete=django.db.models.deletion.CASCADE, to='attendance.student')),
+            ],
+            options={
+                'db_table': 'sms_outbox',
+                'indexes': [models.Index(fields=['status', 'next_attempt_at'], name='sms_outbox_due_idx')],
+                'unique_together': {('roll_no', 'attendance_date')},
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.0.6 on 2026-10-18 18:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0012_sms_outbox'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='monthlyregister',
+            index=models.Index(fields=['month'], name='monthly_register_month_idx'),
+        ),
+    ]
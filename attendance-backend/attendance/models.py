@@ -4,13 +4,13 @@ from django.utils import timezone
 class Student(models.Model):
     roll_no = models.IntegerField(primary_key=True)
     student_name = models.CharField(max_length=100)
-    class_name = models.CharField(max_length=10, db_column="class")
+    class_name = models.CharField(max_length=10, db_column="class", db_index=True)
     
     fingerprint_id = models.IntegerField(
         null=True, 
         blank=True, 
-        unique=True,
-        help_text="ID stored in fingerprint sensor (1-127)"
+        db_index=True,
+        help_text="ID stored in fingerprint sensor (1-127); per-device slots are in FingerprintSlot"
     )
     fingerprint_enrolled = models.BooleanField(
         default=False,
@@ -53,6 +53,10 @@ class DailyAttendance(models.Model):
     class Meta:
         db_table = "daily_attendance"
         unique_together = ("roll_no", "attendance_date")
+        indexes = [
+            # Present/absent lists for a day
+            models.Index(fields=['attendance_date', 'status'], name='daily_attendance_day_idx'),
+        ]
         # REMOVED managed = False
 
 
@@ -67,12 +71,57 @@ class TotalAttendance(models.Model):
     absent_days = models.IntegerField(default=0)
     continuous_absent = models.IntegerField(default=0)
     present_percentage = models.DecimalField(max_digits=5, decimal_places=2, default=0.00)
+    last_finalized = models.DateField(
+        null=True,
+        blank=True,
+        help_text="Daily rows up to this date are included in the counters"
+    )
 
     class Meta:
         db_table = "total_attendance"
         # REMOVED managed = False
 
 
+class MonthlyRegister(models.Model):
+    """One student's month as day bitmaps: bit n-1 stands for day n"""
+    roll_no = models.ForeignKey(
+        Student,
+        on_delete=models.CASCADE,
+        db_column="roll_no"
+    )
+    month = models.DateField(help_text="First day of the month")
+    present_bits = models.IntegerField(default=0)
+    absent_bits = models.IntegerField(default=0)
+    marked_bits = models.IntegerField(
+        default=0,
+        help_text="Days with any daily_attendance row"
+    )
+
+    class Meta:
+        db_table = "monthly_register"
+        unique_together = ("roll_no", "month")
+        indexes = [
+            # Is a month compacted, and its registers for one day's lists
+            models.Index(fields=['month'], name='monthly_register_month_idx'),
+        ]
+
+
+class ClassDailySummary(models.Model):
+    """Per-class head counts for one day, kept current by scans and finalize"""
+    class_name = models.CharField(max_length=10)
+    attendance_date = models.DateField(db_index=True)
+    present = models.IntegerField(default=0)
+    absent = models.IntegerField(default=0)
+    enrolled = models.IntegerField(
+        default=0,
+        help_text="Students in the class when the day was last counted"
+    )
+
+    class Meta:
+        db_table = "class_daily_summary"
+        unique_together = ("class_name", "attendance_date")
+
+
 # ============== FINGERPRINT SYSTEM ==============
 
 class Device(models.Model):
@@ -118,12 +167,21 @@ class Device(models.Model):
     )
     created_at = models.DateTimeField(auto_now_add=True)
     
-    def is_online(self):
-        if not self.last_seen:
+    @staticmethod
+    def seen_recently(last_seen):
+        if not last_seen:
             return False
-        time_diff = (timezone.now() - self.last_seen).total_seconds()
+        time_diff = (timezone.now() - last_seen).total_seconds()
         return time_diff < 60
     
+    def presence(self):
+        """(last_seen, status, current_mode) including heartbeats not yet flushed"""
+        from .presence import presence_tracker
+        return presence_tracker.snapshot(self)
+    
+    def is_online(self):
+        return self.seen_recently(self.presence()[0])
+    
     def __str__(self):
         return f"{self.name} ({self.device_id})"
     
@@ -132,6 +190,30 @@ class Device(models.Model):
         verbose_name_plural = "Fingerprint Devices"
 
 
+class EnrollmentCampaign(models.Model):
+    """Enrollment of a whole class on one device, queued as one command batch"""
+    
+    device = models.ForeignKey(
+        Device,
+        on_delete=models.CASCADE,
+        related_name='campaigns'
+    )
+    class_name = models.CharField(max_length=50)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        help_text="Last progress report; the campaign's commands expire TTL seconds after it"
+    )
+    
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = "Enrollment Campaign"
+        verbose_name_plural = "Enrollment Campaigns"
+    
+    def __str__(self):
+        return f"{self.class_name} on {self.device_id}"
+
+
 class DeviceCommand(models.Model):
     COMMAND_TYPES = [
         ('enroll', 'Enroll Fingerprint'),
@@ -164,6 +246,13 @@ class DeviceCommand(models.Model):
     fingerprint_id = models.IntegerField(
         help_text="Fingerprint ID in sensor (1-127)"
     )
+    campaign = models.ForeignKey(
+        EnrollmentCampaign,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='commands'
+    )
     status = models.CharField(
         max_length=20, 
         choices=STATUS_CHOICES, 
@@ -181,15 +270,71 @@ class DeviceCommand(models.Model):
         ordering = ['-created_at']
         verbose_name = "Device Command"
         verbose_name_plural = "Device Commands"
+        indexes = [
+            # Queue head lookup: oldest pending command for a device
+            models.Index(fields=['device', 'status', 'created_at'], name='devicecommand_queue_idx'),
+            # Expiry sweep across all devices
+            models.Index(fields=['status', 'created_at'], name='devicecommand_status_idx'),
+        ]
     
     def __str__(self):
         return f"{self.get_command_type_display()} - {self.student.student_name} - {self.get_status_display()}"
     
+    FINISHED_STATUSES = ('completed', 'failed', 'expired')
+    TTL_SECONDS = 300
+    
     def is_expired(self):
-        if self.status in ['completed', 'failed', 'expired']:
+        if self.status in self.FINISHED_STATUSES:
             return False
-        time_diff = (timezone.now() - self.created_at).total_seconds()
-        return time_diff > 300
+        # A campaign stays alive as long as the device keeps reporting
+        started = self.campaign.updated_at if self.campaign_id else self.created_at
+        time_diff = (timezone.now() - started).total_seconds()
+        return time_diff > self.TTL_SECONDS
+
+
+class FingerprintSlot(models.Model):
+    """One storage slot of one device's sensor; free while student is null"""
+    
+    CAPACITY = 127
+    
+    device = models.ForeignKey(
+        Device,
+        on_delete=models.CASCADE,
+        related_name='slots'
+    )
+    slot = models.PositiveSmallIntegerField(
+        help_text="Fingerprint ID in sensor (1-127)"
+    )
+    student = models.ForeignKey(
+        Student,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        db_column="roll_no",
+        related_name='fingerprint_slots',
+        help_text="Holder of the slot, reserved as soon as an enroll command is queued"
+    )
+    enrolled = models.BooleanField(
+        default=False,
+        help_text="True once the device confirmed the template is stored"
+    )
+    
+    class Meta:
+        db_table = "fingerprint_slot"
+        constraints = [
+            models.UniqueConstraint(fields=['device', 'slot'], name='fingerprint_slot_unique'),
+        ]
+        indexes = [
+            # Free list: the lowest free slot is the first entry of this index
+            models.Index(
+                fields=['device', 'slot'],
+                condition=models.Q(student__isnull=True),
+                name='fingerprint_slot_free_idx'
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.device_id} #{self.slot}"
 
 
 class AttendanceLog(models.Model):
@@ -205,13 +350,115 @@ class AttendanceLog(models.Model):
         blank=True,
         help_text="Device that recorded this attendance"
     )
-    timestamp = models.DateTimeField(auto_now_add=True)
-    attendance_date = models.DateField(auto_now_add=True)
+    # Defaults rather than auto_now_add so buffered scans keep their scan time
+    timestamp = models.DateTimeField(default=timezone.now)
+    attendance_date = models.DateField(default=timezone.localdate)
     
     class Meta:
         ordering = ['-timestamp']
+        indexes = [
+            # First scan of a student on a day
+            models.Index(fields=['student', 'attendance_date'], name='attendancelog_day_idx'),
+            # Latest scans on the dashboard
+            models.Index(fields=['-timestamp'], name='attendancelog_recent_idx'),
+        ]
         verbose_name = "Attendance Log"
         verbose_name_plural = "Attendance Logs"
     
     def __str__(self):
         return f"{self.student.student_name} - {self.timestamp.strftime('%Y-%m-%d %H:%M')}"
+
+
+class SmsMessage(models.Model):
+    """One parent SMS in the outbox, with its delivery state (see outbox.py)"""
+
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+
+    roll_no = models.ForeignKey(
+        Student,
+        on_delete=models.CASCADE,
+        db_column="roll_no"
+    )
+    attendance_date = models.DateField(db_index=True, help_text="Day the notice is about")
+    contact = models.CharField(max_length=15)
+    body = models.TextField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(
+        default=timezone.now,
+        help_text="Earliest next send; while sending, when the claim lapses"
+    )
+    last_error = models.TextField(blank=True)
+    gateway_message_id = models.CharField(max_length=100, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = "sms_outbox"
+        # One absence notice per student and day, however often finalize runs
+        unique_together = ("roll_no", "attendance_date")
+        indexes = [
+            # Worker claim: due messages, oldest first
+            models.Index(fields=['status', 'next_attempt_at'], name='sms_outbox_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.contact} ({self.attendance_date}, {self.status})"
+
+
+# ---------- academic year archive (see rollover.py) ----------
+
+class ArchivedStudent(models.Model):
+    """A student who left at a year-end rollover, with the parent contact they had"""
+    academic_year = models.CharField(max_length=9, help_text="e.g. 2025-26")
+    roll_no = models.IntegerField()
+    student_name = models.CharField(max_length=100)
+    class_name = models.CharField(max_length=10, db_column="class")
+    parent_name = models.CharField(max_length=100, null=True, blank=True)
+    contact = models.CharField(max_length=15, null=True, blank=True)
+    address = models.CharField(max_length=255, null=True, blank=True)
+
+    class Meta:
+        db_table = "archived_student"
+        unique_together = ("academic_year", "roll_no")
+
+    def __str__(self):
+        return f"{self.student_name} (Roll: {self.roll_no}, {self.academic_year})"
+
+
+class AttendanceArchive(models.Model):
+    """A closed year's daily mark, with the class and first scan of that day"""
+    academic_year = models.CharField(max_length=9)
+    roll_no = models.IntegerField()
+    class_name = models.CharField(max_length=10, db_column="class")
+    attendance_date = models.DateField()
+    status = models.CharField(max_length=1)
+    first_scan = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = "attendance_archive"
+        unique_together = ("roll_no", "attendance_date")
+        indexes = [
+            models.Index(fields=['academic_year', 'class_name'], name='attendance_archive_year_idx'),
+        ]
+
+
+class TotalAttendanceArchive(models.Model):
+    """A student's totals as they stood when the year was closed"""
+    academic_year = models.CharField(max_length=9)
+    roll_no = models.IntegerField()
+    student_name = models.CharField(max_length=100)
+    class_name = models.CharField(max_length=10, db_column="class")
+    present_days = models.IntegerField(default=0)
+    absent_days = models.IntegerField(default=0)
+    continuous_absent = models.IntegerField(default=0)
+    present_percentage = models.DecimalField(max_digits=5, decimal_places=2, default=0.00)
+
+    class Meta:
+        db_table = "total_attendance_archive"
+        unique_together = ("academic_year", "roll_no")
@@ -0,0 +1,166 @@
+"""
+Wake-up notifications for requests that wait on something to happen.
+
+A long-polling scanner waits on ``device:<device_id>`` until a command is
+queued for it; a status stream waits on ``command:<id>``.  Notifications
+are only wake-ups: waiters always re-read the database afterwards, so a
+spurious or duplicated notification is harmless.
+
+Delivery inside the publishing process is immediate.  On PostgreSQL the
+notification also goes out through NOTIFY and a listener thread in every
+other process hands it to its local waiters; elsewhere waiters in other
+processes simply fall back to their timeout.
+"""
+
+import asyncio
+import json
+import logging
+import select
+import threading
+import time
+from collections import defaultdict
+
+from django.db import connection, transaction
+
+
+logger = logging.getLogger(__name__)
+
+PG_CHANNEL = 'attendance_events'
+
+
+class Subscription:
+    def __init__(self, notifier, channel):
+        self.notifier = notifier
+        self.channel = channel
+        self._event = threading.Event()
+        try:
+            self._loop = asyncio.get_running_loop()
+            self._async_event = asyncio.Event()
+        except RuntimeError:
+            self._loop = None
+            self._async_event = None
+
+    def _notify(self, payload):
+        self._event.set()
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._async_event.set)
+
+    def wait(self, timeout):
+        """Block until notified or timeout; returns True when notified"""
+        notified = self._event.wait(timeout)
+        self._event.clear()
+        return notified
+
+    async def async_wait(self, timeout):
+        """Like wait() without holding a thread; subscribe from async code"""
+        if self._event.is_set():
+            self._event.clear()
+            return True
+        try:
+            await asyncio.wait_for(self._async_event.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            self._async_event.clear()
+            self._event.clear()
+        return True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.notifier.unsubscribe(self)
+
+
+class Notifier:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = defaultdict(set)
+        self._listener = None
+
+    def listen(self, channel):
+        """
+        Subscribe to a channel.  Use as a context manager and subscribe
+        *before* checking the database so nothing published in between
+        is missed.
+        """
+        self._ensure_listener()
+        subscription = Subscription(self, channel)
+        with self._lock:
+            self._subscriptions[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.channel)
+            if subscriptions:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.channel]
+
+    def publish(self, channel, payload=''):
+        """Notify waiters once the current transaction has committed"""
+        transaction.on_commit(lambda: self._send(channel, payload))
+
+    def _send(self, channel, payload):
+        self._dispatch(channel, payload)
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT pg_notify(%s, %s)",
+                    [PG_CHANNEL, json.dumps([channel, payload])]
+                )
+
+    def _dispatch(self, channel, payload):
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(channel, ()))
+        for subscription in subscriptions:
+            subscription._notify(payload)
+
+    # ---------- PostgreSQL LISTEN ----------
+
+    def _ensure_listener(self):
+        if self._listener is not None:
+            return
+        if connection.vendor != 'postgresql' or connection.Database.__name__ != 'psycopg2':
+            return
+        with self._lock:
+            if self._listener is None:
+                self._listener = threading.Thread(
+                    target=self._listen_forever,
+                    args=(connection.get_connection_params(),),
+                    name='attendance-notifier',
+                    daemon=True,
+                )
+                self._listener.start()
+
+    def _listen_forever(self, params):
+        while True:
+            try:
+                self._listen(params)
+            except Exception:
+                logger.exception('Notification listener lost its connection')
+                time.sleep(5)
+
+    def _listen(self, params):
+        pg = connection.Database.connect(**params)
+        try:
+            pg.autocommit = True
+            with pg.cursor() as cursor:
+                cursor.execute(f'LISTEN {PG_CHANNEL}')
+            while True:
+                if select.select([pg], [], [], 30) == ([], [], []):
+                    continue
+                pg.poll()
+                while pg.notifies:
+                    note = pg.notifies.pop(0)
+                    try:
+                        channel, payload = json.loads(note.payload)
+                    except ValueError:
+                        continue
+                    self._dispatch(channel, payload)
+        finally:
+            pg.close()
+
+
+notifier = Notifier()
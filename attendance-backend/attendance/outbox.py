@@ -0,0 +1,177 @@
+"""
+Parent SMS outbox.
+
+Finalize only queues: queue_absence_notices() copies the day's absent
+list (messages included, see absences.py) into sms_outbox with one
+bulk INSERT, so no request thread ever waits on a gateway.  The
+``manage.py send_sms`` worker then drains the outbox:
+
+- due messages are claimed in batches with SELECT ... FOR UPDATE SKIP
+  LOCKED, so several workers never send one message twice; a claim
+  lapses after CLAIM_SECONDS in case a worker dies mid-batch;
+- a batch is sent from SMS_CONCURRENCY threads, all drawing on one
+  per-gateway rate limit (SMS_RATE_PER_SECOND) kept in Django's cache,
+  which every worker shares when REDIS_URL is set;
+- failures are retried with exponential backoff up to SMS_MAX_ATTEMPTS
+  and every message records its attempts, last error and provider id.
+"""
+
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .absences import absent_list_json
+from .models import SmsMessage
+from .sms import SmsError, get_gateway
+
+
+RATE_KEY_PREFIX = 'attendance:sms-rate:'
+
+# A claimed batch must be sent within this long, or it is claimed again
+CLAIM_SECONDS = 300
+
+# Retry delays: 1, 2, 4, ... minutes, at most an hour
+RETRY_BASE_SECONDS = 60
+RETRY_MAX_SECONDS = 60 * 60
+
+
+def queue_absence_notices(day):
+    """Queue one SMS per absent student with a parent contact; returns how many were new"""
+    messages = [
+        SmsMessage(
+            roll_no_id=entry['roll_no'],
+            attendance_date=day,
+            contact=entry['contact'],
+            body=entry['message'],
+        )
+        for entry in json.loads(absent_list_json(day))
+        if entry['contact']
+    ]
+    if not messages:
+        return 0
+
+    before = SmsMessage.objects.filter(attendance_date=day).count()
+    # A second finalize of the day finds its notices already queued
+    SmsMessage.objects.bulk_create(messages, batch_size=1000, ignore_conflicts=True)
+    return SmsMessage.objects.filter(attendance_date=day).count() - before
+
+
+def cancel_absence_notices(keys):
+    """Drop the unsent notices for (roll_no, attendance_date) absences a late scan corrected"""
+    condition = Q()
+    for roll_no, day in keys:
+        condition |= Q(roll_no_id=roll_no, attendance_date=day)
+    if not condition:
+        return 0
+    return SmsMessage.objects.filter(condition, status='pending').delete()[0]
+
+
+class RateLimiter:
+    """At most per_second sends per second for one gateway, across threads and workers"""
+
+    def __init__(self, name, per_second):
+        self.name = name
+        self.per_second = per_second
+
+    def acquire(self):
+        while True:
+            now = time.time()
+            key = f'{RATE_KEY_PREFIX}{self.name}:{int(now)}'
+            cache.add(key, 0, timeout=5)
+            try:
+                if cache.incr(key) <= self.per_second:
+                    return
+            except ValueError:
+                # The key expired between add() and incr()
+                continue
+            time.sleep(int(now) + 1 - now)
+
+
+def retry_delay(attempts):
+    return timedelta(seconds=min(RETRY_BASE_SECONDS * 2 ** (attempts - 1), RETRY_MAX_SECONDS))
+
+
+def claim_due(limit):
+    """Claim up to `limit` due messages, oldest first, counting the attempt"""
+    now = timezone.now()
+    claimed_until = now + timedelta(seconds=CLAIM_SECONDS)
+    due = dict(status__in=('pending', 'sending'), next_attempt_at__lte=now)
+
+    with transaction.atomic():
+        ids = list(SmsMessage.objects.select_for_update(skip_locked=True).filter(
+            **due
+        ).order_by('next_attempt_at', 'id').values_list('id', flat=True)[:limit])
+
+        if not ids:
+            return []
+
+        # The conditional update keeps claims exactly-once without row locks (SQLite)
+        SmsMessage.objects.filter(pk__in=ids, **due).update(
+            status='sending',
+            next_attempt_at=claimed_until,
+            attempts=F('attempts') + 1
+        )
+        return list(SmsMessage.objects.filter(
+            pk__in=ids, status='sending', next_attempt_at=claimed_until
+        ).order_by('id'))
+
+
+def _deliver(gateway, limiter, message):
+    """(provider id, None) or (None, SmsError)"""
+    limiter.acquire()
+    try:
+        return gateway.send(message.contact, message.body), None
+    except SmsError as e:
+        return None, e
+    except Exception as e:
+        return None, SmsError(f'{type(e).__name__}: {e}')
+
+
+class OutboxWorker:
+    def __init__(self, gateway=None):
+        self.gateway = gateway or get_gateway()
+        self.limiter = RateLimiter(self.gateway.name, settings.SMS_RATE_PER_SECOND)
+        self.executor = ThreadPoolExecutor(max_workers=settings.SMS_CONCURRENCY)
+
+    def close(self):
+        self.executor.shutdown()
+
+    def send_batch(self, limit=None):
+        """Claim and send one batch; returns (sent, retrying, failed) counts"""
+        messages = claim_due(limit or settings.SMS_BATCH_SIZE)
+        if not messages:
+            return 0, 0, 0
+
+        results = self.executor.map(
+            lambda message: _deliver(self.gateway, self.limiter, message), messages
+        )
+
+        now = timezone.now()
+        counts = {'sent': 0, 'pending': 0, 'failed': 0}
+        for message, (message_id, error) in zip(messages, results):
+            if error is None:
+                message.status = 'sent'
+                message.sent_at = now
+                message.gateway_message_id = message_id or ''
+                message.last_error = ''
+            elif error.retryable and message.attempts < settings.SMS_MAX_ATTEMPTS:
+                message.status = 'pending'
+                message.next_attempt_at = now + retry_delay(message.attempts)
+                message.last_error = str(error)
+            else:
+                message.status = 'failed'
+                message.last_error = str(error)
+            counts[message.status] += 1
+
+        SmsMessage.objects.bulk_update(
+            messages,
+            ['status', 'sent_at', 'gateway_message_id', 'last_error', 'next_attempt_at']
+        )
+        return counts['sent'], counts['pending'], counts['failed']
@@ -0,0 +1,158 @@
+"""
+Write-behind tracking of device heartbeats.
+
+Scanners report in on every scan, every command poll and every heartbeat.
+Writing each of those to the Device row costs an UPDATE for information
+that only matters at the granularity of Device.is_online() (60 s).
+Instead the latest heartbeat is kept in Django's cache, where every worker
+can read it, and the dirty entries of this process are written back to the
+Device table in one bulk update from a timer, at most
+DEVICE_PRESENCE_FLUSH_SECONDS after the first of them, whether or not the
+process sees another request.
+
+Each process remembers which devices already have a row, so a heartbeat
+does not need a get_or_create.  That memory follows the shared 'devices'
+version stamp (bumped by every Device save and delete, see signals.py),
+so a device deleted through one worker is created again by all of them.
+"""
+
+import atexit
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, connection
+from django.utils import timezone
+
+from .models import Device
+from .versions import get_version
+
+
+KEY_PREFIX = 'attendance:presence:'
+
+
+class PresenceTracker:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._known = set()
+        self._known_version = None
+        self._known_at = 0.0
+        self._pending = {}
+        self._timer = None
+
+    def _ensure_device(self, device_id, status):
+        # Without a shared cache the stamp is per process; age bounds the staleness
+        version = get_version('devices')
+        with self._lock:
+            if (
+                version != self._known_version
+                or time.monotonic() - self._known_at > settings.DEVICE_PRESENCE_FLUSH_SECONDS
+            ):
+                self._known = set()
+                self._known_version = version
+                self._known_at = time.monotonic()
+            if device_id in self._known:
+                return
+
+        Device.objects.get_or_create(
+            device_id=device_id,
+            defaults={'name': f'Device {device_id}', 'status': status}
+        )
+        with self._lock:
+            if self._known_version == version:
+                self._known.add(device_id)
+
+    def touch(self, device_id, status='online', mode=None):
+        """Record a heartbeat; creates the Device row the first time it is seen"""
+        self._ensure_device(device_id, status)
+        now = timezone.now()
+
+        key = KEY_PREFIX + device_id
+        if mode is None:
+            previous = cache.get(key)
+            if previous:
+                mode = previous[2]
+        cache.set(key, (now, status, mode), timeout=None)
+
+        with self._lock:
+            self._pending[device_id] = (now, status, mode)
+            if self._timer is None:
+                self._timer = threading.Timer(settings.DEVICE_PRESENCE_FLUSH_SECONDS, self._flush_from_timer)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def _flush_from_timer(self):
+        with self._lock:
+            self._timer = None
+        try:
+            self.flush()
+        except DatabaseError:
+            pass
+        finally:
+            # The timer thread's own connection
+            connection.close()
+
+    def forget(self, device_id):
+        with self._lock:
+            self._known.discard(device_id)
+            self._pending.pop(device_id, None)
+        cache.delete(KEY_PREFIX + device_id)
+
+    def flush(self):
+        """Write this process's pending heartbeats to the Device table"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+
+        if not pending:
+            return
+
+        with_mode = []
+        without_mode = []
+        for device_id, (last_seen, status, mode) in pending.items():
+            device = Device(device_id=device_id, last_seen=last_seen, status=status)
+            if mode is None:
+                without_mode.append(device)
+            else:
+                device.current_mode = mode
+                with_mode.append(device)
+
+        if with_mode:
+            Device.objects.bulk_update(with_mode, ['last_seen', 'status', 'current_mode'])
+        if without_mode:
+            Device.objects.bulk_update(without_mode, ['last_seen', 'status'])
+
+    def _merge(self, device, entry):
+        if entry and (device.last_seen is None or entry[0] > device.last_seen):
+            last_seen, status, mode = entry
+            return last_seen, status, mode or device.current_mode
+        return device.last_seen, device.status, device.current_mode
+
+    def snapshot(self, device):
+        """Latest (last_seen, status, current_mode) for a Device instance"""
+        return self._merge(device, cache.get(KEY_PREFIX + device.device_id))
+
+    def entries(self, device_ids):
+        """Raw cached (last_seen, status, mode) per device id; None when not cached"""
+        found = cache.get_many([KEY_PREFIX + device_id for device_id in device_ids])
+        return [found.get(KEY_PREFIX + device_id) for device_id in device_ids]
+
+    def snapshots(self, devices):
+        """Like snapshot() for many devices with a single cache lookup"""
+        devices = list(devices)
+        entries = cache.get_many([KEY_PREFIX + d.device_id for d in devices])
+        return {
+            d.device_id: self._merge(d, entries.get(KEY_PREFIX + d.device_id))
+            for d in devices
+        }
+
+
+presence_tracker = PresenceTracker()
+
+
+@atexit.register
+def _flush_on_exit():
+    try:
+        presence_tracker.flush()
+    except DatabaseError:
+        pass
@@ -0,0 +1,177 @@
+"""
+Per-device command queue.
+
+Commands are claimed oldest-first with SELECT ... FOR UPDATE SKIP LOCKED,
+so two workers serving the same scanner can never hand out one command
+twice.  Stale commands (DeviceCommand.TTL_SECONDS) are skipped when
+claiming and expired in bulk by ``manage.py expire_commands``, which
+also returns their reserved fingerprint slots.  Commands of an enrollment
+campaign go stale only when the campaign has seen no progress for the
+TTL, so a long class enrollment is not cut off halfway.
+"""
+
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import DeviceCommand, EnrollmentCampaign, FingerprintSlot
+from .notifier import notifier
+from .slots import confirm_slot, release_reservations, release_slot
+
+
+def _stale_cutoff(now):
+    return now - timedelta(seconds=DeviceCommand.TTL_SECONDS)
+
+
+def _live(now):
+    cutoff = _stale_cutoff(now)
+    return (
+        Q(campaign__isnull=True, created_at__gt=cutoff)
+        | Q(campaign__updated_at__gt=cutoff)
+    )
+
+
+def _stale(now):
+    cutoff = _stale_cutoff(now)
+    return (
+        Q(campaign__isnull=True, created_at__lte=cutoff)
+        | Q(campaign__updated_at__lte=cutoff)
+    )
+
+
+def touch_campaigns(campaign_ids, now=None):
+    """Record campaign progress, which keeps its remaining commands alive"""
+    campaign_ids = {c for c in campaign_ids if c is not None}
+    if campaign_ids:
+        EnrollmentCampaign.objects.filter(id__in=campaign_ids).update(
+            updated_at=now or timezone.now()
+        )
+
+
+def claim_next_commands(device_id, limit=1):
+    """
+    Mark up to `limit` of the oldest live pending commands in_progress
+    and return them in queue order.
+    """
+    now = timezone.now()
+
+    with transaction.atomic():
+        commands = list(DeviceCommand.objects.select_for_update(
+            skip_locked=True, of=('self',)
+        ).select_related('student').filter(
+            _live(now),
+            device_id=device_id,
+            status='pending'
+        ).order_by('created_at', 'id')[:limit])
+
+        if not commands:
+            return []
+
+        # Backends without row locks (SQLite) still get exactly-once
+        # claims from the conditional update
+        ids = [command.pk for command in commands]
+        claimed = DeviceCommand.objects.filter(
+            pk__in=ids, status='pending'
+        ).update(status='in_progress', updated_at=now)
+        if claimed < len(ids):
+            won = set(DeviceCommand.objects.filter(
+                pk__in=ids, status='in_progress', updated_at=now
+            ).values_list('pk', flat=True))
+            commands = [command for command in commands if command.pk in won]
+
+        for command in commands:
+            command.status = 'in_progress'
+            command.updated_at = now
+            notifier.publish(f'command:{command.id}')
+        touch_campaigns((command.campaign_id for command in commands), now)
+
+    return commands
+
+
+def claim_next_command(device_id):
+    """Mark the oldest live pending command in_progress and return it, or None"""
+    commands = claim_next_commands(device_id)
+    return commands[0] if commands else None
+
+
+def expire_stale_commands():
+    """Expire every unfinished command older than the TTL; returns the count"""
+    now = timezone.now()
+
+    with transaction.atomic():
+        stale = DeviceCommand.objects.filter(
+            _stale(now),
+            status__in=['pending', 'in_progress']
+        )
+        commands = list(stale.select_for_update(skip_locked=True, of=('self',)).only(
+            'id', 'device_id', 'student_id', 'command_type', 'fingerprint_id'
+        ))
+        if not commands:
+            return 0
+
+        DeviceCommand.objects.filter(id__in=[c.id for c in commands]).update(
+            status='expired',
+            message='Command timeout',
+            updated_at=now
+        )
+        release_reservations(commands)
+        for command in commands:
+            notifier.publish(f'command:{command.id}')
+
+    return len(commands)
+
+
+def record_command_result(command_id, result, message):
+    """
+    Apply a status report from the device.
+
+    Completing an enroll confirms the reserved slot; completing a delete
+    frees it; a failed enroll gives its reservation back.  Returns False
+    when the command does not exist.
+    """
+    with transaction.atomic():
+        command = DeviceCommand.objects.select_for_update(of=('self',)).select_related(
+            'student'
+        ).filter(id=command_id).first()
+
+        if command is None:
+            return False
+
+        student = command.student
+
+        if result == 'success':
+            command.status = 'completed'
+            command.completed_at = timezone.now()
+            command.message = message or 'Operation successful'
+
+            if command.command_type == 'enroll':
+                confirm_slot(command.device_id, command.fingerprint_id, student)
+                student.fingerprint_enrolled = True
+                student.fingerprint_id = command.fingerprint_id
+            elif command.command_type == 'delete':
+                release_slot(command.device_id, command.fingerprint_id)
+                # Still enrolled if another device holds the student's template
+                remaining = FingerprintSlot.objects.filter(
+                    student=student, enrolled=True
+                ).values_list('slot', flat=True).first()
+                student.fingerprint_enrolled = remaining is not None
+                student.fingerprint_id = remaining
+
+            student.save()
+
+        elif result == 'error':
+            command.status = 'failed'
+            command.message = message or 'Operation failed'
+            release_reservations([command])
+
+        elif result == 'in_progress':
+            command.status = 'in_progress'
+            command.message = message
+
+        command.save()
+        touch_campaigns([command.campaign_id])
+        notifier.publish(f'command:{command.id}')
+
+    return True
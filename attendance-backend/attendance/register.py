@@ -0,0 +1,252 @@
+"""
+Monthly attendance register as per-student day bitmaps.
+
+daily_attendance spends a row (plus index entries) on every student and
+day.  A MonthlyRegister row holds a whole month for one student in three
+31-bit integers (bit n-1 is day n): days present, days absent, and days
+with any mark.  compact_month() folds a month of daily rows into
+registers with one grouped INSERT, expand_month() writes them back, and
+the report helpers below work on the bitmaps directly, so a monthly
+register reads one row per student.
+
+Readers of a compacted month merge the registers with whatever daily
+rows it still has (or was given after compaction): month_bitmaps(), the
+day lists through register_day_sql(), the history and the export.
+Finalize, the totals rebuild and the streak backfill only count
+daily_attendance, so they raise CompactedMonthError for a span with
+compacted months; expand_month() turns a month back into daily rows.
+"""
+
+import calendar
+from datetime import timedelta
+
+from django.db import connection, transaction
+
+from .absences import invalidate_absent_lists
+from .models import DailyAttendance, MonthlyRegister
+from .versions import bump_version_on_commit
+
+
+class CompactedMonthError(Exception):
+    pass
+
+
+def month_start(value):
+    return value.replace(day=1)
+
+
+def month_end(value):
+    return value.replace(day=calendar.monthrange(value.year, value.month)[1])
+
+
+def month_label(value):
+    return value.strftime('%Y-%m')
+
+
+def month_days(value):
+    start = month_start(value)
+    return [start + timedelta(days=n) for n in range(month_end(value).day)]
+
+
+def invalidate_months(days):
+    """Daily rows of these dates changed; bumps their months' stamps (see history.py)"""
+    for month in {month_start(day) for day in days}:
+        bump_version_on_commit(f'month:{month_label(month)}')
+
+
+def _day_of_month_sql():
+    if connection.vendor == 'postgresql':
+        return "EXTRACT(DAY FROM d.attendance_date)::int"
+    return "CAST(strftime('%%d', d.attendance_date) AS INTEGER)"
+
+
+def _bitmaps_sql(class_name):
+    """Grouped SELECT of (roll_no, present, absent, marked) bitmaps for one month"""
+    bit = f"(1 << ({_day_of_month_sql()} - 1))"
+    scope = "AND d.roll_no IN (SELECT roll_no FROM student WHERE class = %s)" if class_name else ""
+    # A student has at most one row per day, so summing distinct bits is an OR
+    return f"""
+        SELECT
+            d.roll_no,
+            SUM(CASE WHEN d.status = 'P' THEN {bit} ELSE 0 END) AS present_bits,
+            SUM(CASE WHEN d.status = 'A' THEN {bit} ELSE 0 END) AS absent_bits,
+            SUM({bit}) AS marked_bits
+        FROM daily_attendance d
+        WHERE d.attendance_date BETWEEN %s AND %s {scope}
+        GROUP BY d.roll_no
+    """
+
+
+def _bitmaps_params(month, class_name):
+    params = [month_start(month), month_end(month)]
+    if class_name:
+        params.append(class_name)
+    return params
+
+
+def compacted_months(start, end, class_name=None):
+    """Labels of the months from start to end that have registers"""
+    registers = MonthlyRegister.objects.filter(month__range=(month_start(start), end))
+    if class_name:
+        registers = registers.filter(roll_no__class_name=class_name)
+    months = registers.order_by('month').values_list('month', flat=True).distinct()
+    return [month_label(month) for month in months]
+
+
+def check_not_compacted(start, end, class_name=None):
+    """Raise CompactedMonthError when a month from start to end has registers"""
+    months = compacted_months(start, end, class_name)
+    if months:
+        raise CompactedMonthError(
+            f"{', '.join(months)} compacted into monthly registers; "
+            f"expand first (manage.py compact_attendance --expand {' '.join(months)})"
+        )
+
+
+def register_day_sql(day, status, class_name=None):
+    """
+    SELECT of the roll_nos whose register marks `status` on day and that
+    have no daily row for it, as (sql, params)
+    """
+    bits = 'present_bits' if status == 'P' else 'absent_bits'
+    scope = "AND r.roll_no IN (SELECT roll_no FROM student WHERE class = %s)" if class_name else ""
+    return f"""
+        SELECT r.roll_no
+        FROM monthly_register r
+        WHERE r.month = %s
+          AND (r.{bits} >> %s) & 1 = 1
+          AND NOT EXISTS (
+              SELECT 1 FROM daily_attendance d
+              WHERE d.roll_no = r.roll_no AND d.attendance_date = %s
+          ) {scope}
+    """, [month_start(day), day.day - 1, day, *([class_name] if class_name else [])]
+
+
+def compact_month(month, class_name=None):
+    """Store (or refresh) the month's registers from daily_attendance; returns the row count"""
+    month = month_start(month)
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            INSERT INTO monthly_register (roll_no, month, present_bits, absent_bits, marked_bits)
+            SELECT b.roll_no, %s, b.present_bits, b.absent_bits, b.marked_bits
+            FROM ({_bitmaps_sql(class_name)}) AS b
+            WHERE true
+            ON CONFLICT (roll_no, month) DO UPDATE
+            SET present_bits = excluded.present_bits,
+                absent_bits = excluded.absent_bits,
+                marked_bits = excluded.marked_bits
+        """, [month, *_bitmaps_params(month, class_name)])
+        return cursor.rowcount
+
+
+def prune_month(month):
+    """Delete the month's daily rows that a register already holds"""
+    month = month_start(month)
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            DELETE FROM daily_attendance
+            WHERE attendance_date BETWEEN %s AND %s
+              AND roll_no IN (SELECT roll_no FROM monthly_register WHERE month = %s)
+        """, [month, month_end(month), month])
+        pruned = cursor.rowcount
+    invalidate_absent_lists(month_days(month))
+    invalidate_months([month])
+    return pruned
+
+
+def expand_month(month):
+    """Write the month's registers back to daily_attendance and drop them; returns the rows written"""
+    month = month_start(month)
+    rows = []
+    for register in MonthlyRegister.objects.filter(month=month):
+        for day in marked_days(register.marked_bits):
+            rows.append(DailyAttendance(
+                roll_no_id=register.roll_no_id,
+                attendance_date=month + timedelta(days=day - 1),
+                status='P' if register.present_bits >> (day - 1) & 1 else 'A'
+            ))
+    with transaction.atomic():
+        DailyAttendance.objects.bulk_create(rows, batch_size=1000, ignore_conflicts=True)
+        MonthlyRegister.objects.filter(month=month).delete()
+        invalidate_absent_lists(month_days(month))
+        invalidate_months([month])
+    return len(rows)
+
+
+def month_bitmaps(month, class_name=None):
+    """
+    {roll_no: (present, absent, marked)} for a month: the stored registers,
+    overlaid with the month's daily rows (all of them before compaction,
+    the late ones after).
+    """
+    month = month_start(month)
+    registers = MonthlyRegister.objects.filter(month=month)
+    if class_name:
+        registers = registers.filter(roll_no__class_name=class_name)
+    bitmaps = {
+        roll_no: (present, absent, marked)
+        for roll_no, present, absent, marked in registers.values_list(
+            'roll_no', 'present_bits', 'absent_bits', 'marked_bits'
+        )
+    }
+
+    with connection.cursor() as cursor:
+        cursor.execute(_bitmaps_sql(class_name), _bitmaps_params(month, class_name))
+        for roll_no, *daily in cursor.fetchall():
+            present, absent, marked = (int(v) for v in daily)
+            if roll_no in bitmaps:
+                # A daily row wins over the register for its day
+                stored_present, stored_absent, stored_marked = bitmaps[roll_no]
+                present |= stored_present & ~marked
+                absent |= stored_absent & ~marked
+                marked |= stored_marked
+            bitmaps[roll_no] = (present, absent, marked)
+    return bitmaps
+
+
+# ---------- bitmap reports ----------
+
+def marked_days(bits):
+    """Day numbers whose bit is set, in order"""
+    days = []
+    while bits:
+        low = bits & -bits
+        days.append(low.bit_length())
+        bits ^= low
+    return days
+
+
+def day_codes(present, absent, days_in_month):
+    """Register line: 'P', 'A' or '-' for each day of the month"""
+    return ''.join(
+        'P' if present >> n & 1 else 'A' if absent >> n & 1 else '-'
+        for n in range(days_in_month)
+    )
+
+
+def percentage(present, absent):
+    days = (present | absent).bit_count()
+    return round(100 * present.bit_count() / days, 2) if days else 0
+
+
+def absent_streaks(absent, marked):
+    """
+    (longest, current) runs of absences over the marked days, so that
+    unmarked days (holidays, weekends) neither break nor extend a run.
+    """
+    # Squeeze the unmarked days out, then a run of set bits is a streak
+    packed = 0
+    for position, day in enumerate(marked_days(marked)):
+        packed |= (absent >> (day - 1) & 1) << position
+
+    longest, run = 0, packed
+    while run:
+        run &= run >> 1
+        longest += 1
+
+    current = 0
+    top = marked.bit_count() - 1
+    while current <= top and packed >> (top - current) & 1:
+        current += 1
+
+    return longest, current
@@ -0,0 +1,247 @@
+"""
+Academic year rollover.
+
+At year end every class moves up a grade, the leavers go, and the
+counters start again from zero.  Done through the admin that is a
+click per student, and each Student delete cascades row by row through
+its attendance, logs and commands.  rollover_year() does the whole
+thing as a handful of set-based statements in one transaction:
+
+1. The year's daily marks (compacted months included, see register.py)
+   are copied into attendance_archive with each day's class and first
+   scan, and the totals into total_attendance_archive.
+2. The leavers are copied into archived_student with their parent
+   contact, their fingerprint slots are freed in one UPDATE and their
+   rows are deleted table by table.
+3. The remaining students are promoted with a single UPDATE driven by
+   the class mapping, and the year's live rows are deleted and the
+   totals reset.
+"""
+
+import re
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.db.models import Min
+
+from .fingerprints import invalidate_fingerprint_cache
+from .models import DailyAttendance, MonthlyRegister, Student, TotalAttendanceArchive
+from .register import invalidate_months, month_end, month_start
+from .totals import create_missing_totals
+from .versions import bump_version_on_commit
+
+
+GRADE_RE = re.compile(r'^(\d+)(.*)$')
+
+# Live tables keyed by roll_no, in the order a leaver's rows are deleted
+LEAVER_TABLES = (
+    'attendance_devicecommand',
+    'attendance_attendancelog',
+    'daily_attendance',
+    'monthly_register',
+    'total_attendance',
+    'sms_outbox',
+    'parent_detail',
+)
+
+
+class RolloverError(Exception):
+    pass
+
+
+def academic_year_label(year_end):
+    """'2025-26' for a year ending in 2026"""
+    return f'{year_end.year - 1}-{year_end.year % 100:02d}'
+
+
+def default_promotions(class_names, final_grade):
+    """
+    {class: next class, or None for leavers}: the leading grade number
+    goes up by one and the section is kept ('9-A' -> '10-A'); classes of
+    the final grade leave.  Raises RolloverError for names without a
+    leading grade.
+    """
+    promotions = {}
+    for class_name in class_names:
+        match = GRADE_RE.match(class_name)
+        if match is None:
+            raise RolloverError(f"Class {class_name!r} has no grade number; map it explicitly")
+        grade, section = int(match.group(1)), match.group(2)
+        promotions[class_name] = None if grade >= final_grade else f'{grade + 1}{section}'
+    return promotions
+
+
+def _in_list(values):
+    return ', '.join(['%s'] * len(values))
+
+
+def _register_days_sql():
+    """SELECT of (roll_no, attendance_date, status) for every marked register day"""
+    numbers = ' UNION ALL '.join(f'SELECT {n} AS day' for n in range(1, 32))
+    if connection.vendor == 'postgresql':
+        day = "r.month + (n.day - 1)"
+    else:
+        day = "date(r.month, '+' || (n.day - 1) || ' days')"
+    return f"""
+        SELECT r.roll_no, {day} AS attendance_date,
+               CASE WHEN (r.present_bits >> (n.day - 1)) & 1 = 1 THEN 'P' ELSE 'A' END AS status
+        FROM monthly_register r CROSS JOIN ({numbers}) AS n
+        WHERE r.month <= %s
+          AND (r.marked_bits >> (n.day - 1)) & 1 = 1
+    """
+
+
+def _archive_attendance(cursor, label, year_end):
+    """Copy the year's marks, compacted months included; returns the rows archived"""
+    archived = 0
+    for source, params in (
+        ("SELECT roll_no, attendance_date, status FROM daily_attendance WHERE attendance_date <= %s", [year_end]),
+        # Months compacted without --prune are already in from daily_attendance
+        (_register_days_sql(), [month_start(year_end)]),
+    ):
+        cursor.execute(f"""
+            INSERT INTO attendance_archive
+                (academic_year, roll_no, class, attendance_date, status, first_scan)
+            SELECT %s, m.roll_no, s.class, m.attendance_date, m.status, (
+                SELECT MIN(al.timestamp)
+                FROM attendance_attendancelog al
+                WHERE al.roll_no = m.roll_no
+                  AND al.attendance_date = m.attendance_date
+            )
+            FROM ({source}) AS m
+            JOIN student s ON s.roll_no = m.roll_no
+            WHERE m.attendance_date <= %s
+            ON CONFLICT (roll_no, attendance_date) DO NOTHING
+        """, [label, *params, year_end])
+        archived += cursor.rowcount
+    return archived
+
+
+def _archive_totals(cursor, label):
+    cursor.execute("""
+        INSERT INTO total_attendance_archive
+            (academic_year, roll_no, student_name, class, present_days,
+             absent_days, continuous_absent, present_percentage)
+        SELECT %s, s.roll_no, s.student_name, s.class, t.present_days,
+               t.absent_days, t.continuous_absent, t.present_percentage
+        FROM total_attendance t
+        JOIN student s ON s.roll_no = t.roll_no
+    """, [label])
+    return cursor.rowcount
+
+
+def _remove_leavers(cursor, label, leaving):
+    """Archive and delete the students of the leaving classes; returns their count"""
+    if not leaving:
+        return 0
+    in_classes = _in_list(leaving)
+    leavers = f"SELECT roll_no FROM student WHERE class IN ({in_classes})"
+
+    cursor.execute(f"""
+        INSERT INTO archived_student
+            (academic_year, roll_no, student_name, class, parent_name, contact, address)
+        SELECT %s, s.roll_no, s.student_name, s.class, p.parent_name, p.contact, p.address
+        FROM student s
+        LEFT JOIN parent_detail p ON p.roll_no = s.roll_no
+        WHERE s.class IN ({in_classes})
+    """, [label, *leaving])
+    removed = cursor.rowcount
+
+    # The templates stay on the sensors until the slots are enrolled over
+    cursor.execute(f"""
+        UPDATE fingerprint_slot SET roll_no = NULL, enrolled = %s
+        WHERE roll_no IN ({leavers})
+    """, [False, *leaving])
+
+    for table in LEAVER_TABLES:
+        cursor.execute(f"DELETE FROM {table} WHERE roll_no IN ({leavers})", leaving)
+    cursor.execute(f"DELETE FROM student WHERE class IN ({in_classes})", leaving)
+    return removed
+
+
+def _promote(cursor, moving):
+    """Move every remaining class to its next class in one UPDATE"""
+    if not moving:
+        return 0
+    cases = ' '.join(['WHEN %s THEN %s'] * len(moving))
+    cursor.execute(f"""
+        UPDATE student SET class = CASE class {cases} END
+        WHERE class IN ({_in_list(moving)})
+    """, [value for pair in moving.items() for value in pair] + list(moving))
+    return cursor.rowcount
+
+
+def _clear_year(cursor, year_end):
+    """Delete the archived year from the live tables and zero the totals"""
+    cursor.execute("DELETE FROM attendance_attendancelog WHERE attendance_date <= %s", [year_end])
+    cursor.execute("DELETE FROM daily_attendance WHERE attendance_date <= %s", [year_end])
+    # Only months that lie wholly inside the year
+    cursor.execute("DELETE FROM monthly_register WHERE month < %s", [month_start(year_end + timedelta(days=1))])
+    cursor.execute("DELETE FROM class_daily_summary WHERE attendance_date <= %s", [year_end])
+    cursor.execute("DELETE FROM sms_outbox WHERE attendance_date <= %s", [year_end])
+    cursor.execute("""
+        UPDATE total_attendance
+        SET present_days = 0, absent_days = 0, continuous_absent = 0,
+            present_percentage = 0, last_finalized = NULL
+    """)
+
+
+def _archived_months(year_end):
+    first = min(filter(None, (
+        DailyAttendance.objects.filter(attendance_date__lte=year_end).aggregate(first=Min('attendance_date'))['first'],
+        MonthlyRegister.objects.filter(month__lte=year_end).aggregate(first=Min('month'))['first'],
+    )), default=None)
+    months = []
+    month = month_start(first) if first else None
+    while month and month <= year_end:
+        months.append(month)
+        month = month_end(month) + timedelta(days=1)
+    return months
+
+
+def rollover_year(year_end, promotions=None, final_grade=12, label=None, dry_run=False):
+    """
+    Close the academic year ending on year_end.
+
+    promotions maps each class to its next class, None for leavers;
+    classes left out follow default_promotions().  Returns a dict of
+    counts.  Raises RolloverError when the year was already closed or a
+    class cannot be mapped; with dry_run everything is rolled back.
+    """
+    label = label or academic_year_label(year_end)
+
+    with transaction.atomic():
+        if TotalAttendanceArchive.objects.filter(academic_year=label).exists():
+            raise RolloverError(f"Academic year {label} has already been rolled over")
+
+        # Every student gets an archived total, which also marks the year closed
+        create_missing_totals()
+
+        class_names = set(Student.objects.values_list('class_name', flat=True).distinct())
+        mapping = dict(promotions or {})
+        mapping.update(default_promotions(class_names - set(mapping), final_grade))
+        leaving = sorted(name for name in class_names if mapping[name] is None)
+        moving = {name: mapping[name] for name in sorted(class_names) if mapping[name] is not None}
+
+        months = _archived_months(year_end)
+
+        with connection.cursor() as cursor:
+            result = {
+                'academic_year': label,
+                'attendance_archived': _archive_attendance(cursor, label, year_end),
+                'totals_archived': _archive_totals(cursor, label),
+                'leavers': _remove_leavers(cursor, label, leaving),
+                'promoted': _promote(cursor, moving),
+                'promotions': {name: mapping[name] for name in class_names},
+            }
+            _clear_year(cursor, year_end)
+
+        if dry_run:
+            transaction.set_rollback(True)
+        else:
+            invalidate_fingerprint_cache()
+            invalidate_months(months)
+            for name in ('students', 'totals'):
+                bump_version_on_commit(name)
+
+    return result
@@ -0,0 +1,190 @@
+"""
+Bulk roster import from CSV.
+
+The start of the year means adding thousands of students, which one
+StudentSerializer.create() at a time costs two INSERTs and a round of
+validation each.  import_roster() reads the CSV row by row, validates
+each chunk of rows together (one query finds the roll numbers already
+taken) and writes Student, ParentDetail and TotalAttendance rows with
+chunked bulk_create inside a single transaction.
+
+An import is all or nothing: when any row is rejected the transaction
+is rolled back and the report lists every problem by line, so the file
+can be fixed and imported again as a whole.
+"""
+
+import csv
+import re
+
+from django.db import transaction
+
+from .models import ParentDetail, Student, TotalAttendance
+from .versions import bump_version_on_commit
+
+
+# Rows validated and written per round trip
+CHUNK_SIZE = 1000
+
+# The report stops listing rows after this many, but keeps counting
+MAX_REPORTED_ERRORS = 500
+
+REQUIRED_COLUMNS = ('roll_no', 'student_name', 'class_name', 'parent_name', 'contact')
+
+# Header spellings accepted for each column
+COLUMN_ALIASES = {
+    'class': 'class_name',
+    'name': 'student_name',
+    'phone': 'contact',
+}
+
+# Digits with an optional leading +, after spaces, dashes and brackets are dropped
+CONTACT_RE = re.compile(r'^\+?\d{10,14}$')
+CONTACT_NOISE_RE = re.compile(r'[\s\-()]')
+
+
+def _header(fieldnames):
+    columns = [COLUMN_ALIASES.get(name.strip().lower(), name.strip().lower()) for name in fieldnames or []]
+    missing = [column for column in REQUIRED_COLUMNS if column not in columns]
+    return columns, missing
+
+
+def _limit(field, value, max_length, errors):
+    if not value:
+        errors.append(f'{field} is required')
+    elif len(value) > max_length:
+        errors.append(f'{field} is longer than {max_length} characters')
+
+
+def _clean(row):
+    """(values, errors) for one CSV row"""
+    values = {key: (row.get(key) or '').strip() for key in (*REQUIRED_COLUMNS, 'address')}
+    errors = []
+
+    try:
+        values['roll_no'] = int(values['roll_no'])
+        if values['roll_no'] <= 0:
+            raise ValueError
+    except ValueError:
+        errors.append('roll_no must be a positive whole number')
+
+    _limit('student_name', values['student_name'], 100, errors)
+    _limit('class_name', values['class_name'], 10, errors)
+    _limit('parent_name', values['parent_name'], 100, errors)
+
+    values['contact'] = CONTACT_NOISE_RE.sub('', values['contact'])
+    if not CONTACT_RE.match(values['contact']):
+        errors.append('contact must be 10 to 14 digits, optionally starting with +')
+
+    if len(values['address']) > 255:
+        errors.append('address is longer than 255 characters')
+
+    return values, errors
+
+
+class _Report:
+    def __init__(self):
+        self.rows = 0
+        self.created = 0
+        self.error_count = 0
+        self.errors = []
+
+    def reject(self, line, roll_no, errors):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'line': line, 'roll_no': roll_no, 'errors': errors})
+
+    def as_dict(self, committed):
+        # Chunk checks run after the per-row ones; report in file order
+        self.errors.sort(key=lambda error: error['line'])
+        return {
+            'rows': self.rows,
+            'created': self.created if committed else 0,
+            'error_count': self.error_count,
+            'errors': self.errors,
+            'committed': committed,
+        }
+
+
+def _write_chunk(chunk, seen, report):
+    """Validate a chunk against the database and bulk-insert its good rows"""
+    taken = set(Student.objects.filter(
+        roll_no__in=[values['roll_no'] for _, values in chunk]
+    ).values_list('roll_no', flat=True))
+
+    students, parents, totals = [], [], []
+    for line, values in chunk:
+        roll_no = values['roll_no']
+        # Earlier chunks are already written, so check the file first
+        if roll_no in seen:
+            report.reject(line, roll_no, [f'roll_no {roll_no} is repeated from line {seen[roll_no]}'])
+            continue
+        if roll_no in taken:
+            report.reject(line, roll_no, [f'roll_no {roll_no} already exists'])
+            continue
+        seen[roll_no] = line
+
+        students.append(Student(
+            roll_no=roll_no,
+            student_name=values['student_name'],
+            class_name=values['class_name']
+        ))
+        parents.append(ParentDetail(
+            roll_no_id=roll_no,
+            parent_name=values['parent_name'],
+            contact=values['contact'],
+            address=values['address'] or None
+        ))
+        totals.append(TotalAttendance(roll_no_id=roll_no))
+
+    # Once a row has failed the import is rolled back; keep validating only
+    if report.error_count:
+        return
+
+    Student.objects.bulk_create(students)
+    ParentDetail.objects.bulk_create(parents)
+    TotalAttendance.objects.bulk_create(totals)
+    report.created += len(students)
+
+
+def import_roster(stream, dry_run=False):
+    """
+    Import students from a text stream of CSV with a header row.
+
+    Returns the report dict: rows read, students created, and the
+    rejected rows with their line numbers and reasons.  Nothing is
+    written when any row is rejected or dry_run is set.
+    """
+    reader = csv.DictReader(stream)
+    columns, missing = _header(reader.fieldnames)
+    report = _Report()
+
+    if missing:
+        report.reject(1, None, [f"missing column(s): {', '.join(missing)}"])
+        return report.as_dict(committed=False)
+    reader.fieldnames = columns
+
+    seen = {}
+    with transaction.atomic():
+        chunk = []
+        for row in reader:
+            report.rows += 1
+            values, errors = _clean(row)
+            if errors:
+                report.reject(reader.line_num, values['roll_no'] or None, errors)
+            else:
+                chunk.append((reader.line_num, values))
+
+            if len(chunk) >= CHUNK_SIZE:
+                _write_chunk(chunk, seen, report)
+                chunk = []
+
+        if chunk:
+            _write_chunk(chunk, seen, report)
+
+        committed = not (dry_run or report.error_count) and report.created > 0
+        if committed:
+            bump_version_on_commit('students')
+        else:
+            transaction.set_rollback(True)
+
+    return report.as_dict(committed)
@@ -0,0 +1,326 @@
+"""
+Scan ingestion for the ESP32 scanners.
+
+A scanner that lost Wi-Fi (or is simply busy during the morning rush)
+buffers its fingerprint hits and uploads them together.  Everything here
+works on whole batches so the query count stays flat no matter how many
+scans arrive in one request.
+
+A scan can arrive after its day was finalized, when the student already
+has an 'A' row: the row is corrected to 'P', the totals and class counts
+move the day from absent to present and the unsent absence SMS is
+dropped (see correct_absences()).  Any 'P' row for a day the totals
+already include is added to them straight away.
+"""
+
+from datetime import date, timedelta
+
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .absences import invalidate_absent_lists, invalidate_totals
+from .fingerprints import fingerprint_cache
+from .register import invalidate_months
+from .models import AttendanceLog
+from .outbox import cancel_absence_notices
+from .presence import presence_tracker
+from .summaries import ENROLLED_SQL, count_present, uncount_absent
+from .totals import apply_late_marks
+
+
+MAX_BATCH_SIZE = 500
+
+# Rows per multi-row INSERT, well under SQLite's bound-parameter limit
+INSERT_CHUNK_SIZE = 500
+
+# Device.device_id is a varchar(50)
+MAX_DEVICE_ID_LENGTH = 50
+
+# A scanner's buffer never holds scans older than this; older stamps are a
+# reset clock, not attendance
+MAX_SCAN_AGE = timedelta(days=7)
+
+
+def clean_device_id(device_id):
+    """Return device_id or raise ValueError"""
+    if not isinstance(device_id, str) or not device_id:
+        raise ValueError('device_id must be a non-empty string')
+    if len(device_id) > MAX_DEVICE_ID_LENGTH:
+        raise ValueError(f'device_id must be at most {MAX_DEVICE_ID_LENGTH} characters')
+    return device_id
+
+
+def _parse_event(event, default_device_id, now):
+    """Return (fingerprint_id, device_id, scanned_at) or raise ValueError"""
+    if not isinstance(event, dict):
+        raise ValueError('event must be an object')
+
+    try:
+        fingerprint_id = int(event.get('fingerprint_id'))
+    except (TypeError, ValueError):
+        raise ValueError('fingerprint_id required')
+    if fingerprint_id <= 0:
+        raise ValueError('fingerprint_id must be positive')
+
+    device_id = clean_device_id(event.get('device_id') or default_device_id)
+
+    raw_time = event.get('scanned_at')
+    if raw_time:
+        scanned_at = parse_datetime(str(raw_time))
+        if scanned_at is None:
+            raise ValueError(f'invalid scanned_at {raw_time!r}')
+        if timezone.is_naive(scanned_at):
+            scanned_at = timezone.make_aware(scanned_at)
+        if scanned_at < now - MAX_SCAN_AGE:
+            raise ValueError(f'scanned_at {raw_time!r} is older than {MAX_SCAN_AGE.days} days')
+        # Scanner clocks drift; never record a scan in the future
+        scanned_at = min(scanned_at, now)
+    else:
+        scanned_at = now
+
+    return fingerprint_id, device_id, scanned_at
+
+
+def _as_date(value):
+    # SQLite hands RETURNING values back as text
+    return date.fromisoformat(value) if isinstance(value, str) else value
+
+
+def upgrade_absent(keys):
+    """
+    Turn the 'A' rows among (roll_no, attendance_date) keys into 'P'.
+    Returns the set of keys corrected.
+    """
+    keys = list(keys)
+    if not keys:
+        return set()
+
+    corrected = set()
+    with connection.cursor() as cursor:
+        if connection.features.can_return_rows_from_bulk_insert:
+            for start in range(0, len(keys), INSERT_CHUNK_SIZE):
+                chunk = keys[start:start + INSERT_CHUNK_SIZE]
+                cursor.execute(f"""
+                    UPDATE daily_attendance SET status = 'P'
+                    WHERE status = 'A'
+                      AND (roll_no, attendance_date) IN ({', '.join(['(%s, %s)'] * len(chunk))})
+                    RETURNING roll_no, attendance_date
+                """, [value for key in chunk for value in key])
+                corrected.update((row[0], _as_date(row[1])) for row in cursor.fetchall())
+        else:
+            for key in keys:
+                cursor.execute("""
+                    UPDATE daily_attendance SET status = 'P'
+                    WHERE roll_no = %s AND attendance_date = %s AND status = 'A'
+                """, list(key))
+                if cursor.rowcount == 1:
+                    corrected.add(key)
+    return corrected
+
+
+def correct_absences(corrected):
+    """Move (roll_no, attendance_date) rows just corrected from 'A' to 'P' out of the absence counts"""
+    if not corrected:
+        return
+    uncount_absent(corrected)
+    cancel_absence_notices(corrected)
+    # The student drops off those days' absent lists
+    invalidate_absent_lists({day for _, day in corrected})
+    invalidate_totals()
+
+
+def insert_present(keys):
+    """
+    Insert a 'P' row for every (roll_no, attendance_date) that has none yet.
+
+    Conflicts are skipped by the database itself, so concurrent scans can
+    never raise IntegrityError.  Returns the set of keys actually inserted.
+    """
+    keys = list(keys)
+    if not keys:
+        return set()
+
+    inserted = set()
+    with connection.cursor() as cursor:
+        if connection.features.can_return_rows_from_bulk_insert:
+            for start in range(0, len(keys), INSERT_CHUNK_SIZE):
+                chunk = keys[start:start + INSERT_CHUNK_SIZE]
+                cursor.execute(f"""
+                    INSERT INTO daily_attendance (roll_no, attendance_date, status)
+                    VALUES {', '.join(["(%s, %s, 'P')"] * len(chunk))}
+                    ON CONFLICT (roll_no, attendance_date) DO NOTHING
+                    RETURNING roll_no, attendance_date
+                """, [value for key in chunk for value in key])
+                inserted.update((row[0], _as_date(row[1])) for row in cursor.fetchall())
+        else:
+            for key in keys:
+                cursor.execute("""
+                    INSERT INTO daily_attendance (roll_no, attendance_date, status)
+                    VALUES (%s, %s, 'P')
+                    ON CONFLICT (roll_no, attendance_date) DO NOTHING
+                """, list(key))
+                if cursor.rowcount == 1:
+                    inserted.add(key)
+    return inserted
+
+
+def mark_present(roll_no, device_id, scanned_at):
+    """
+    Mark one student present and log the scan, atomically.
+
+    Returns the log timestamp, or None when the student was already marked
+    present for that day.  An 'A' row left by finalize is corrected to 'P'.
+    The class's daily summary is counted in the same go.  On PostgreSQL
+    this is a single statement (plus a follow-up for a day the totals
+    already include); elsewhere it is an update, an upsert and the
+    summary and log inserts inside one transaction.
+    """
+    day = timezone.localdate(scanned_at)
+
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            # xmax is only set on a row the ON CONFLICT branch updated
+            cursor.execute(f"""
+                WITH marked AS (
+                    INSERT INTO daily_attendance (roll_no, attendance_date, status)
+                    VALUES (%s, %s, 'P')
+                    ON CONFLICT (roll_no, attendance_date) DO UPDATE
+                    SET status = 'P'
+                    WHERE daily_attendance.status = 'A'
+                    RETURNING roll_no, attendance_date, xmax::text <> '0' AS corrected
+                ),
+                counted AS (
+                    INSERT INTO class_daily_summary
+                        (class_name, attendance_date, present, absent, enrolled)
+                    SELECT s.class, m.attendance_date, 1, 0, {ENROLLED_SQL}
+                    FROM marked m JOIN student s ON s.roll_no = m.roll_no
+                    ON CONFLICT (class_name, attendance_date) DO UPDATE
+                    SET present = class_daily_summary.present + 1
+                )
+                INSERT INTO attendance_attendancelog (roll_no, device_id, timestamp, attendance_date)
+                SELECT roll_no, %s, %s, attendance_date FROM marked
+                RETURNING
+                    timestamp,
+                    (SELECT corrected FROM marked),
+                    EXISTS (
+                        SELECT 1 FROM marked m
+                        JOIN total_attendance t ON t.roll_no = m.roll_no
+                        WHERE t.last_finalized >= m.attendance_date
+                    )
+            """, [roll_no, day, device_id, scanned_at])
+            row = cursor.fetchone()
+        if row is None:
+            return None
+        timestamp, corrected, late = row
+        if corrected or late:
+            marked = {(roll_no, day)}
+            with transaction.atomic():
+                apply_late_marks(marked, marked if corrected else ())
+                correct_absences(marked if corrected else ())
+        return timestamp
+
+    with transaction.atomic():
+        corrected = upgrade_absent([(roll_no, day)])
+        inserted = corrected or insert_present([(roll_no, day)])
+        if not inserted:
+            return None
+        count_present(inserted)
+        apply_late_marks(inserted, corrected)
+        correct_absences(corrected)
+        log = AttendanceLog.objects.create(
+            student_id=roll_no,
+            device_id=device_id,
+            timestamp=scanned_at,
+            attendance_date=day
+        )
+    return log.timestamp
+
+
+def record_scan_batch(events, default_device_id='FP001'):
+    """
+    Resolve, dedupe and store a batch of scan events.
+
+    Returns one result dict per event, in input order.  The first scan of
+    a student on a given day marks them present, correcting an 'A' row
+    ('corrected': true); later ones are reported as duplicates.
+    """
+    now = timezone.now()
+    results = [None] * len(events)
+    parsed = []
+
+    for index, event in enumerate(events):
+        try:
+            fingerprint_id, device_id, scanned_at = _parse_event(event, default_device_id, now)
+        except ValueError as e:
+            results[index] = {'index': index, 'status': 'invalid', 'error': str(e)}
+            continue
+        parsed.append((index, fingerprint_id, device_id, scanned_at))
+
+    if not parsed:
+        return results
+
+    students = fingerprint_cache.resolve_many((p[2], p[1]) for p in parsed)
+
+    # Earliest scan wins when the same student shows up twice in one batch
+    parsed.sort(key=lambda p: p[3])
+
+    first_scans = {}
+
+    for index, fingerprint_id, device_id, scanned_at in parsed:
+        student = students.get((device_id, fingerprint_id))
+        result = {'index': index, 'fingerprint_id': fingerprint_id}
+        results[index] = result
+
+        if student is None:
+            result['status'] = 'unknown_fingerprint'
+            continue
+
+        day = timezone.localdate(scanned_at)
+        key = (student.roll_no, day)
+        result.update({
+            'roll_no': student.roll_no,
+            'student': student.student_name,
+            'date': day.isoformat(),
+        })
+
+        if key in first_scans:
+            result['status'] = 'duplicate'
+            continue
+        first_scans[key] = (result, device_id, scanned_at)
+
+    with transaction.atomic():
+        for device_id in {p[2] for p in parsed}:
+            presence_tracker.touch(device_id)
+
+        # Days finalized before the upload already have an 'A' row
+        corrected = upgrade_absent(first_scans.keys())
+        inserted = corrected | insert_present(key for key in first_scans if key not in corrected)
+        count_present(inserted)
+        # Days the totals already include are folded in now
+        apply_late_marks(inserted, corrected)
+        correct_absences(corrected)
+        # Buffered scans can land in a month whose history is cached
+        current = timezone.localdate(now).replace(day=1)
+        invalidate_months(day for _, day in inserted if day < current)
+
+        new_logs = []
+        for key, (result, device_id, scanned_at) in first_scans.items():
+            if key not in inserted:
+                result['status'] = 'already_marked'
+                continue
+            if key in corrected:
+                result['corrected'] = True
+
+            new_logs.append(AttendanceLog(
+                student_id=key[0],
+                device_id=device_id,
+                timestamp=scanned_at,
+                attendance_date=key[1]
+            ))
+            result['status'] = 'marked'
+            result['timestamp'] = scanned_at.isoformat()
+
+        AttendanceLog.objects.bulk_create(new_logs)
+
+    return results
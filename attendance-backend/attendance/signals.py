@@ -0,0 +1,29 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .fingerprints import invalidate_fingerprint_cache
+from .models import Student, ParentDetail, Device
+from .presence import presence_tracker
+from .versions import bump_version_on_commit
+
+
+@receiver([post_save, post_delete], sender=Student)
+def student_changed(sender, **kwargs):
+    invalidate_fingerprint_cache()
+    bump_version_on_commit('students')
+
+
+@receiver([post_save, post_delete], sender=ParentDetail)
+def parent_changed(sender, **kwargs):
+    # Parent contacts are part of the cached absent lists
+    bump_version_on_commit('students')
+
+
+@receiver([post_save, post_delete], sender=Device)
+def device_changed(sender, **kwargs):
+    bump_version_on_commit('devices')
+
+
+@receiver(post_delete, sender=Device)
+def device_deleted(sender, instance, **kwargs):
+    presence_tracker.forget(instance.device_id)
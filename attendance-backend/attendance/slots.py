@@ -0,0 +1,152 @@
+"""
+Per-device fingerprint slot allocation.
+
+Every device has FingerprintSlot.CAPACITY rows, one per sensor slot.  A
+slot is free while its student is null; a partial index over the free
+rows makes finding the lowest free slot an index lookup whatever the
+sensor's fill level.  Claims use FOR UPDATE SKIP LOCKED plus a
+conditional update, so two admins enrolling at once always get
+different slots.
+"""
+
+from django.db import models
+from django.db.models import Case, Q, When
+
+from .fingerprints import invalidate_fingerprint_cache
+from .models import FingerprintSlot
+
+
+def create_slots(device_id):
+    FingerprintSlot.objects.bulk_create(
+        [FingerprintSlot(device_id=device_id, slot=n) for n in range(1, FingerprintSlot.CAPACITY + 1)],
+        ignore_conflicts=True,
+    )
+
+
+def has_all_slots(device_id):
+    return FingerprintSlot.objects.filter(device_id=device_id).count() >= FingerprintSlot.CAPACITY
+
+
+def enrolled_slot(device_id, student):
+    """The slot holding the student's confirmed fingerprint on a device, or None"""
+    return FingerprintSlot.objects.filter(
+        device_id=device_id, student=student, enrolled=True
+    ).values_list('slot', flat=True).first()
+
+
+def claim_slot(device_id, student):
+    """
+    Reserve the lowest free slot on a device for a student.
+
+    Call inside the transaction that creates the enroll command.  A slot
+    the student already holds (from an unfinished enrollment) is reused.
+    Returns the slot number, or None when the sensor is full.
+    """
+    held = FingerprintSlot.objects.filter(
+        device_id=device_id, student=student, enrolled=False
+    ).values_list('slot', flat=True).first()
+    if held is not None:
+        return held
+
+    for _ in range(3):
+        free = FingerprintSlot.objects.select_for_update(skip_locked=True).filter(
+            device_id=device_id, student__isnull=True
+        ).order_by('slot').first()
+
+        if free is None:
+            if has_all_slots(device_id):
+                return None
+            create_slots(device_id)
+            continue
+
+        if FingerprintSlot.objects.filter(pk=free.pk, student__isnull=True).update(
+            student=student, enrolled=False
+        ):
+            return free.slot
+
+    return None
+
+
+def claim_slots(device_id, students):
+    """
+    Reserve the lowest free slots on a device for many students at once.
+
+    Slots are handed out in the order the students are given.  Students
+    who already hold a slot on the device are skipped.  Returns
+    {roll_no: slot} for the students that got one; the rest did not fit
+    on the sensor or were skipped.
+    """
+    students = list(students)
+    held = set(FingerprintSlot.objects.filter(
+        device_id=device_id, student__in=[student.pk for student in students]
+    ).values_list('student_id', flat=True))
+    wanted = [student for student in students if student.pk not in held]
+    claimed = {}
+
+    for _ in range(3):
+        if not wanted:
+            break
+
+        free = list(FingerprintSlot.objects.select_for_update(skip_locked=True).filter(
+            device_id=device_id, student__isnull=True
+        ).order_by('slot').values_list('pk', 'slot')[:len(wanted)])
+
+        if not free:
+            if has_all_slots(device_id):
+                break
+            create_slots(device_id)
+            continue
+
+        pairs = {pk: (student, slot) for student, (pk, slot) in zip(wanted, free)}
+        FingerprintSlot.objects.filter(pk__in=pairs, student__isnull=True).update(
+            student=Case(
+                *[When(pk=pk, then=student.pk) for pk, (student, _) in pairs.items()],
+                output_field=models.IntegerField()
+            ),
+            enrolled=False
+        )
+
+        # A slot another claimer took in between is retried
+        holders = dict(FingerprintSlot.objects.filter(pk__in=pairs).values_list('pk', 'student_id'))
+        for pk, (student, slot) in pairs.items():
+            if holders.get(pk) == student.pk:
+                claimed[student.pk] = slot
+
+        sensor_full = len(free) < len(wanted)
+        wanted = [student for student in wanted if student.pk not in claimed]
+        if sensor_full:
+            break
+
+    return claimed
+
+
+def confirm_slot(device_id, slot, student):
+    """The device stored the student's template: the slot now resolves scans"""
+    FingerprintSlot.objects.update_or_create(
+        device_id=device_id, slot=slot,
+        defaults={'student': student, 'enrolled': True}
+    )
+    invalidate_fingerprint_cache()
+
+
+def release_slot(device_id, slot):
+    """Return a slot to the free list (template deleted or enrollment abandoned)"""
+    FingerprintSlot.objects.filter(device_id=device_id, slot=slot).update(
+        student=None, enrolled=False
+    )
+    invalidate_fingerprint_cache()
+
+
+def release_reservations(commands):
+    """Free the slots held by unfinished enroll commands in one UPDATE"""
+    condition = None
+    for command in commands:
+        if command.command_type != 'enroll':
+            continue
+        q = Q(device_id=command.device_id, slot=command.fingerprint_id, student_id=command.student_id)
+        condition = q if condition is None else condition | q
+
+    if condition is None:
+        return
+
+    FingerprintSlot.objects.filter(condition, enrolled=False).update(student=None)
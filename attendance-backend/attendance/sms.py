@@ -0,0 +1,73 @@
+"""
+SMS gateways.
+
+A gateway sends one message and returns the provider's message id, or
+raises SmsError.  settings.SMS_GATEWAY names the class to use; a real
+provider is a subclass that overrides send().  The two stand-ins here
+deliver nowhere: ConsoleGateway logs each message and FileGateway
+appends it as a JSON line to settings.SMS_FILE_PATH, which is enough to
+run the whole outbox locally.
+
+send() is called from several worker threads at once and must be
+thread-safe.
+"""
+
+import json
+import logging
+import threading
+import uuid
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+
+logger = logging.getLogger(__name__)
+
+
+class SmsError(Exception):
+    """A failed send; retryable=False means trying again cannot help (bad number)"""
+
+    def __init__(self, message, retryable=True):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+class SmsGateway:
+    # Rate limits are kept per gateway name
+    name = 'gateway'
+
+    def send(self, to, body):
+        raise NotImplementedError
+
+
+class ConsoleGateway(SmsGateway):
+    name = 'console'
+
+    def send(self, to, body):
+        logger.info('SMS to %s: %s', to, body)
+        return f'console-{uuid.uuid4().hex}'
+
+
+class FileGateway(SmsGateway):
+    name = 'file'
+
+    def __init__(self, path=None):
+        self.path = path or settings.SMS_FILE_PATH
+        self._lock = threading.Lock()
+
+    def send(self, to, body):
+        message_id = f'file-{uuid.uuid4().hex}'
+        line = json.dumps({
+            'id': message_id,
+            'to': to,
+            'body': body,
+            'sent_at': timezone.now().isoformat(),
+        })
+        with self._lock, open(self.path, 'a', encoding='utf-8') as f:
+            f.write(line + '\n')
+        return message_id
+
+
+def get_gateway():
+    return import_string(settings.SMS_GATEWAY)()
@@ -0,0 +1,86 @@
+"""
+Per-class daily head counts in class_daily_summary.
+
+Dashboards want "9-A: 32/40 present", which would otherwise mean
+scanning daily_attendance for every view.  Scans bump the present count
+of their class as they are recorded (and take a late scan that corrects
+an absence off the absent count) and finalize recounts the finalized
+days from daily_attendance, so readers only touch one row per class
+and day.
+"""
+
+from django.db import connection
+
+
+# Students currently in the summary row's class
+ENROLLED_SQL = "(SELECT COUNT(*) FROM student e WHERE e.class = s.class)"
+
+
+def count_present(keys):
+    """Add newly inserted (roll_no, attendance_date) 'P' rows to their class counts"""
+    keys = list(keys)
+    if not keys:
+        return
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            INSERT INTO class_daily_summary
+                (class_name, attendance_date, present, absent, enrolled)
+            SELECT s.class, k.column2, COUNT(*), 0, {ENROLLED_SQL}
+            FROM (VALUES {', '.join(['(%s, %s)'] * len(keys))}) AS k
+            JOIN student s ON s.roll_no = k.column1
+            WHERE true
+            GROUP BY s.class, k.column2
+            ON CONFLICT (class_name, attendance_date) DO UPDATE
+            SET present = class_daily_summary.present + excluded.present
+        """, [value for key in keys for value in key])
+
+
+def uncount_absent(keys):
+    """Take (roll_no, attendance_date) rows corrected from 'A' to 'P' off their class's absent counts"""
+    keys = list(keys)
+    if not keys:
+        return
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            UPDATE class_daily_summary
+            SET absent = class_daily_summary.absent - k.corrected
+            FROM (
+                SELECT s.class AS class_name, v.column2 AS attendance_date, COUNT(*) AS corrected
+                FROM (VALUES {', '.join(['(%s, %s)'] * len(keys))}) AS v
+                JOIN student s ON s.roll_no = v.column1
+                GROUP BY s.class, v.column2
+            ) AS k
+            WHERE class_daily_summary.class_name = k.class_name
+              AND class_daily_summary.attendance_date = k.attendance_date
+        """, [value for key in keys for value in key])
+
+
+def refresh_summaries(start, end, class_name=None):
+    """Recount the days from start to end (inclusive) from daily_attendance"""
+    scope, params = 'true', [start, end]
+    if class_name is not None:
+        scope = 's.class = %s'
+        params.append(class_name)
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            INSERT INTO class_daily_summary
+                (class_name, attendance_date, present, absent, enrolled)
+            SELECT
+                s.class,
+                d.attendance_date,
+                COUNT(*) FILTER (WHERE d.status = 'P'),
+                COUNT(*) FILTER (WHERE d.status = 'A'),
+                {ENROLLED_SQL}
+            FROM daily_attendance d
+            JOIN student s ON s.roll_no = d.roll_no
+            WHERE d.attendance_date BETWEEN %s AND %s
+              AND {scope}
+            GROUP BY s.class, d.attendance_date
+            ON CONFLICT (class_name, attendance_date) DO UPDATE
+            SET present = excluded.present,
+                absent = excluded.absent,
+                enrolled = excluded.enrolled
+        """, params)
@@ -1,3 +1,172 @@
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+
+from django.db import connection
 from django.test import TestCase
+from django.utils import timezone
+
+from .fingerprints import fingerprint_cache
+from .models import AttendanceLog, ClassDailySummary, DailyAttendance, Device, Student, TotalAttendance
+from .scans import record_scan_batch
+from .slots import confirm_slot
+from .totals import apply_attendance, backfill_absent_streaks, finalize_day, finalize_range, rebuild_totals
+from .views import PRESENT_LIST_SQL
+
+
+def totals():
+    return list(TotalAttendance.objects.order_by('roll_no').values_list(
+        'roll_no', 'present_days', 'absent_days', 'continuous_absent', 'present_percentage', 'last_finalized'
+    ))
+
+
+class PresentListQueryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.day = timezone.localdate()
+        device = Device.objects.create(device_id='FP001', name='FP001')
+        now = timezone.now()
+        for roll_no in range(1, 21):
+            student = Student.objects.create(roll_no=roll_no, student_name=f'Student {roll_no}', class_name='10A')
+            DailyAttendance.objects.create(
+                roll_no=student,
+                attendance_date=cls.day,
+                status='P' if roll_no % 2 else 'A'
+            )
+        # Two scans for the same student on the same day
+        AttendanceLog.objects.create(student_id=1, device=device, timestamp=now, attendance_date=cls.day)
+        AttendanceLog.objects.create(
+            student_id=1, device=device, timestamp=now + timedelta(minutes=5), attendance_date=cls.day
+        )
+        cls.first_scan = now
+
+    def query_plan(self):
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                # Tiny test tables would otherwise be read sequentially
+                cursor.execute("SET LOCAL enable_seqscan = off")
+                cursor.execute("EXPLAIN " + PRESENT_LIST_SQL, [self.day])
+            else:
+                cursor.execute("EXPLAIN QUERY PLAN " + PRESENT_LIST_SQL, [self.day])
+            return '\n'.join(str(row) for row in cursor.fetchall())
+
+    def test_plan_uses_day_indexes(self):
+        plan = self.query_plan()
+        self.assertIn('daily_attendance_day_idx', plan)
+        self.assertIn('attendancelog_day_idx', plan)
+        self.assertNotIn('DATE(', plan.upper())
+
+    def test_one_row_per_student_with_first_scan(self):
+        response = self.client.get('/api/attendance/present/', {'date': self.day.isoformat()})
+
+        self.assertEqual(response.status_code, 200)
+        rows = response.json()
+        self.assertEqual([row['roll_no'] for row in rows], list(range(1, 21, 2)))
+        self.assertEqual(rows[0]['time'], timezone.localtime(self.first_scan).strftime('%H:%M:%S'))
+        self.assertIsNone(rows[1]['time'])
+
+
+class ScanBatchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        # Latest school day before today (Sundays are not finalized)
+        cls.day = timezone.localdate() - timedelta(days=1)
+        if cls.day.weekday() == 6:
+            cls.day -= timedelta(days=1)
+        Device.objects.create(device_id='FP001', name='FP001')
+        for roll_no in (1, 2):
+            student = Student.objects.create(roll_no=roll_no, student_name=f'Student {roll_no}', class_name='10A')
+            confirm_slot('FP001', roll_no, student)
+
+    def setUp(self):
+        fingerprint_cache.invalidate()
+
+    def scan(self, fingerprint_id, minutes=0):
+        scanned_at = timezone.make_aware(datetime.combine(self.day, time(9))) + timedelta(minutes=minutes)
+        return {'fingerprint_id': fingerprint_id, 'scanned_at': scanned_at.isoformat()}
+
+    def test_statuses(self):
+        too_old = (timezone.now() - timedelta(days=8)).isoformat()
+        results = record_scan_batch([
+            self.scan(1, minutes=5),
+            self.scan(1),
+            self.scan(99),
+            {'fingerprint_id': 'x'},
+            {'fingerprint_id': 2, 'scanned_at': too_old},
+        ])
+
+        self.assertEqual(
+            [result['status'] for result in results],
+            ['duplicate', 'marked', 'unknown_fingerprint', 'invalid', 'invalid']
+        )
+        self.assertIn('older than', results[4]['error'])
+        self.assertEqual(AttendanceLog.objects.get().timestamp.minute, 0)
+
+        results = record_scan_batch([self.scan(1, minutes=10)])
+        self.assertEqual(results[0]['status'], 'already_marked')
+
+    def test_late_scan_corrects_finalized_absence(self):
+        finalize_range(self.day, self.day)
+
+        results = record_scan_batch([self.scan(1)])
+
+        self.assertEqual(results[0]['status'], 'marked')
+        self.assertTrue(results[0]['corrected'])
+        self.assertEqual(DailyAttendance.objects.get(roll_no=1, attendance_date=self.day).status, 'P')
+        self.assertEqual(totals()[0], (1, 1, 0, 0, 100, self.day))
+        summary = ClassDailySummary.objects.get(class_name='10A', attendance_date=self.day)
+        self.assertEqual((summary.present, summary.absent), (1, 1))
+
+        corrected = totals()
+        rebuild_totals(self.day)
+        self.assertEqual(totals(), corrected)
+
+
+class TotalsTests(TestCase):
+    # Monday to Wednesday
+    days = [date(2026, 3, 2), date(2026, 3, 3), date(2026, 3, 4)]
+
+    @classmethod
+    def setUpTestData(cls):
+        for roll_no in (1, 2):
+            Student.objects.create(roll_no=roll_no, student_name=f'Student {roll_no}', class_name='10A')
+        DailyAttendance.objects.create(roll_no_id=1, attendance_date=cls.days[1], status='P')
+
+    def test_apply_attendance_twice_counts_once(self):
+        finalize_range(self.days[0], self.days[2])
+        once = totals()
+
+        self.assertEqual(apply_attendance(self.days[2]), 0)
+        self.assertEqual(totals(), once)
+        self.assertEqual(once, [
+            (1, 1, 2, 1, Decimal('33.33'), self.days[2]),
+            (2, 0, 3, 3, 0, self.days[2]),
+        ])
+
+    def test_finalize_range_reaching_back(self):
+        finalize_range(self.days[1], self.days[2])
+        DailyAttendance.objects.create(roll_no_id=2, attendance_date=self.days[0], status='P')
+
+        finalize_range(self.days[0], self.days[0])
+
+        self.assertEqual(totals(), [
+            (1, 1, 2, 1, Decimal('33.33'), self.days[2]),
+            (2, 1, 2, 2, Decimal('33.33'), self.days[2]),
+        ])
+
+    def test_finalize_day_before_last_finalized(self):
+        finalize_day(self.days[0])
+        finalize_day(self.days[2])
+
+        finalize_day(self.days[1])
+
+        self.assertEqual(totals(), [
+            (1, 1, 2, 1, Decimal('33.33'), self.days[2]),
+            (2, 0, 3, 3, 0, self.days[2]),
+        ])
+
+    def test_backfill_absent_streaks(self):
+        finalize_range(self.days[0], self.days[2])
+        TotalAttendance.objects.update(continuous_absent=0)
 
-# Create your tests here.
+        self.assertEqual(backfill_absent_streaks(), 2)
+        self.assertEqual([row[3] for row in totals()], [1, 3])
@@ -0,0 +1,349 @@
+"""
+Maintenance of the running totals in total_attendance.
+
+Finalizing a day only applies the daily_attendance rows that the
+counters have not seen yet: every total row remembers the last date it
+includes (last_finalized), so the work is one index range per student
+and does not grow with the length of the school year.  Running finalize
+twice for the same day is a no-op.  rebuild_totals() recomputes
+everything from the full history, for repair.
+
+finalize_range() redoes a whole span of days (a scanner that was offline
+for a week, a late import) with one INSERT ... SELECT over a generated
+date series and one aggregate refresh.  Everything can be limited to one
+class, so ``manage.py finalize_range`` can spread a large roster over a
+process pool.
+
+continuous_absent is the student's current run of absent days: finalize
+resets it on a present day and extends it on an absent one, in the same
+pass as the counters.  backfill_absent_streaks() derives it from the
+whole history at once.
+
+A buffered scan uploaded after its day was finalized turns the day's 'A'
+row into 'P' (or adds a 'P' row for a student who had none);
+apply_late_marks() folds such days into the totals, moving a corrected
+one from absent to present and cutting the streak short.
+
+All of these count daily_attendance only, so they refuse (with
+register.CompactedMonthError) to run over a month that has been
+compacted into monthly registers, whose daily rows may be gone.
+"""
+
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Max
+
+from .absences import invalidate_absent_lists, invalidate_totals
+from .register import check_not_compacted, invalidate_months
+from .models import TotalAttendance
+from .summaries import refresh_summaries
+
+
+def _class_filter(class_name, column='roll_no'):
+    """SQL condition and params limiting a statement to one class"""
+    if class_name is None:
+        return 'true', []
+    return f'{column} IN (SELECT roll_no FROM student WHERE class = %s)', [class_name]
+
+
+def _school_days_sql(start, end):
+    """SELECT of the school days between start and end, inclusive"""
+    weekdays = ', '.join(str(int(day)) for day in settings.SCHOOL_WEEKDAYS)
+    if connection.vendor == 'postgresql':
+        return f"""
+            SELECT day::date AS day
+            FROM generate_series(%s::date, %s::date, interval '1 day') AS day
+            WHERE EXTRACT(ISODOW FROM day) - 1 IN ({weekdays})
+        """, [start, end]
+    return f"""
+        WITH RECURSIVE series(day) AS (
+            SELECT date(%s)
+            UNION ALL
+            SELECT date(day, '+1 day') FROM series WHERE day < date(%s)
+        )
+        SELECT day FROM series
+        WHERE (CAST(strftime('%%w', day) AS INTEGER) + 6) %% 7 IN ({weekdays})
+    """, [start, end]
+
+
+def create_missing_totals(class_name=None):
+    """
+    Give every student (of one class) a total_attendance row.  Per-class
+    calls insert disjoint keys, so the finalize_range pool can run them
+    side by side without deadlocking on each other's new rows.
+    """
+    scope, scope_params = _class_filter(class_name)
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            INSERT INTO total_attendance
+                (roll_no, present_days, absent_days, continuous_absent, present_percentage)
+            SELECT roll_no, 0, 0, 0, 0 FROM student WHERE {scope}
+            ON CONFLICT (roll_no) DO NOTHING
+        """, scope_params)
+
+
+def mark_absentees(day):
+    """Insert an 'A' row for every student with no row for the day"""
+    check_not_compacted(day, day)
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            INSERT INTO daily_attendance (roll_no, attendance_date, status)
+            SELECT roll_no, %s, 'A' FROM student WHERE true
+            ON CONFLICT (roll_no, attendance_date) DO NOTHING
+        """, [day])
+        absent = cursor.rowcount
+    invalidate_absent_lists([day])
+    invalidate_months([day])
+    return absent
+
+
+def apply_attendance(through, class_name=None):
+    """
+    Add every daily row after a student's last_finalized and up to
+    `through` to their counters, in one statement.  Returns the number
+    of students updated.
+    """
+    scope, scope_params = _class_filter(class_name, 't.roll_no')
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            UPDATE total_attendance
+            SET
+                present_days = total_attendance.present_days + delta.present,
+                absent_days = total_attendance.absent_days + delta.absent,
+                continuous_absent = CASE
+                    WHEN delta.last_present IS NULL
+                        THEN total_attendance.continuous_absent + delta.absent
+                    ELSE delta.absent_since_present
+                END,
+                present_percentage = COALESCE(ROUND(
+                    100.0 * (total_attendance.present_days + delta.present)
+                    / NULLIF(total_attendance.present_days + delta.present
+                             + total_attendance.absent_days + delta.absent, 0),
+                    2
+                ), 0),
+                last_finalized = %s
+            FROM (
+                SELECT
+                    roll_no,
+                    COUNT(*) FILTER (WHERE status = 'P') AS present,
+                    COUNT(*) FILTER (WHERE status = 'A') AS absent,
+                    MAX(last_present) AS last_present,
+                    COUNT(*) FILTER (
+                        WHERE status = 'A' AND attendance_date > last_present
+                    ) AS absent_since_present
+                FROM (
+                    SELECT
+                        d.roll_no,
+                        d.attendance_date,
+                        d.status,
+                        MAX(CASE WHEN d.status = 'P' THEN d.attendance_date END)
+                            OVER (PARTITION BY d.roll_no) AS last_present
+                    FROM total_attendance t
+                    JOIN daily_attendance d ON d.roll_no = t.roll_no
+                    WHERE d.attendance_date > COALESCE(t.last_finalized, '0001-01-01')
+                      AND d.attendance_date <= %s
+                      AND {scope}
+                ) AS unseen
+                GROUP BY roll_no
+            ) AS delta
+            WHERE total_attendance.roll_no = delta.roll_no
+              AND (total_attendance.last_finalized IS NULL
+                   OR total_attendance.last_finalized < %s)
+        """, [through, through, *scope_params, through])
+        updated = cursor.rowcount
+    invalidate_totals()
+    return updated
+
+
+def apply_late_marks(marked, corrected):
+    """
+    Fold 'P' rows written for days the totals already include: marked are
+    the (roll_no, attendance_date) keys made present, corrected the ones
+    among them that were counted as 'A'.  Days after a student's
+    last_finalized are left to the next finalize.  Returns the number of
+    students updated.
+    """
+    marked = list(marked)
+    if not marked:
+        return 0
+
+    corrected = set(corrected)
+    params = [value for key in marked for value in (*key, 1 if key in corrected else 0)]
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            UPDATE total_attendance
+            SET
+                present_days = total_attendance.present_days + late.present,
+                absent_days = total_attendance.absent_days - late.corrected,
+                continuous_absent = CASE
+                    WHEN late.absent_after < total_attendance.continuous_absent THEN late.absent_after
+                    ELSE total_attendance.continuous_absent
+                END,
+                present_percentage = COALESCE(ROUND(
+                    100.0 * (total_attendance.present_days + late.present)
+                    / NULLIF(total_attendance.present_days + late.present
+                             + total_attendance.absent_days - late.corrected, 0),
+                    2
+                ), 0)
+            FROM (
+                SELECT
+                    g.roll_no,
+                    g.present,
+                    g.corrected,
+                    -- The streak now starts after the latest day made present
+                    (
+                        SELECT COUNT(*) FROM daily_attendance d
+                        WHERE d.roll_no = g.roll_no
+                          AND d.status = 'A'
+                          AND d.attendance_date > g.last_day
+                          AND d.attendance_date <= g.last_finalized
+                    ) AS absent_after
+                FROM (
+                    SELECT
+                        k.column1 AS roll_no,
+                        COUNT(*) AS present,
+                        SUM(k.column3) AS corrected,
+                        MAX(k.column2) AS last_day,
+                        t.last_finalized
+                    FROM (VALUES {', '.join(['(%s, %s, %s)'] * len(marked))}) AS k
+                    JOIN total_attendance t ON t.roll_no = k.column1
+                    WHERE k.column2 <= t.last_finalized
+                    GROUP BY k.column1, t.last_finalized
+                ) AS g
+            ) AS late
+            WHERE total_attendance.roll_no = late.roll_no
+        """, params)
+        updated = cursor.rowcount
+    if updated:
+        invalidate_totals()
+    return updated
+
+
+def finalize_day(day):
+    """
+    Mark the day's absentees and fold the day into the totals.  A day
+    before the latest one the totals include gets the totals rebuilt,
+    as apply_attendance() only adds days after a student's last_finalized.
+    """
+    with transaction.atomic():
+        absent = mark_absentees(day)
+        create_missing_totals()
+        finalized = TotalAttendance.objects.aggregate(last=Max('last_finalized'))['last']
+        if finalized is not None and finalized > day:
+            updated = rebuild_totals(finalized)
+        else:
+            updated = apply_attendance(day)
+        refresh_summaries(day, day)
+    return absent, updated
+
+
+def rebuild_totals(through, class_name=None):
+    """Recompute totals (of one class, or everyone) from the full history"""
+    check_not_compacted(date.min, through, class_name)
+    scope, scope_params = _class_filter(class_name)
+    with transaction.atomic():
+        create_missing_totals(class_name)
+        with connection.cursor() as cursor:
+            cursor.execute(f"""
+                UPDATE total_attendance
+                SET present_days = 0, absent_days = 0, continuous_absent = 0,
+                    present_percentage = 0, last_finalized = NULL
+                WHERE {scope}
+            """, scope_params)
+        return apply_attendance(through, class_name)
+
+
+def mark_absentees_between(start, end, class_name=None):
+    """Insert an 'A' row for every student and school day with no row yet"""
+    check_not_compacted(start, end, class_name)
+    days, days_params = _school_days_sql(start, end)
+    scope, scope_params = _class_filter(class_name, 's.roll_no')
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            INSERT INTO daily_attendance (roll_no, attendance_date, status)
+            SELECT s.roll_no, days.day, 'A'
+            FROM student s CROSS JOIN ({days}) AS days
+            WHERE {scope}
+            ON CONFLICT (roll_no, attendance_date) DO NOTHING
+        """, [*days_params, *scope_params])
+        absent = cursor.rowcount
+    days = [start + timedelta(days=n) for n in range((end - start).days + 1)]
+    invalidate_absent_lists(days)
+    invalidate_months(days)
+    return absent
+
+
+def finalize_range(start, end, class_name=None):
+    """
+    Finalize every school day from start to end, inclusive.
+
+    When the range reaches back into days the totals already include,
+    the affected totals are rebuilt; otherwise the new days are simply
+    added.  Returns (rows marked absent, students updated).
+    """
+    with transaction.atomic():
+        absent = mark_absentees_between(start, end, class_name)
+        create_missing_totals(class_name)
+
+        totals = TotalAttendance.objects.all()
+        if class_name is not None:
+            totals = totals.filter(roll_no__class_name=class_name)
+        finalized = totals.aggregate(last=Max('last_finalized'))['last']
+
+        if finalized is not None and finalized >= start:
+            updated = rebuild_totals(max(end, finalized), class_name)
+        else:
+            updated = apply_attendance(end, class_name)
+
+        refresh_summaries(start, end, class_name)
+
+    return absent, updated
+
+
+def backfill_absent_streaks():
+    """
+    Set continuous_absent from the full history in one statement.
+
+    Gaps and islands: numbering each student's days overall and per
+    status gives every run of equal statuses a constant difference, so
+    the latest run is the streak when it is a run of absences.  Only
+    days up to last_finalized count, to agree with the other counters.
+    Returns the number of students updated.
+    """
+    last = TotalAttendance.objects.aggregate(last=Max('last_finalized'))['last']
+    if last is not None:
+        check_not_compacted(date.min, last)
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            UPDATE total_attendance
+            SET continuous_absent = latest.streak
+            FROM (
+                SELECT
+                    roll_no,
+                    CASE WHEN status = 'A' THEN length ELSE 0 END AS streak,
+                    ROW_NUMBER() OVER (PARTITION BY roll_no ORDER BY ended DESC) AS recency
+                FROM (
+                    SELECT roll_no, status, COUNT(*) AS length, MAX(attendance_date) AS ended
+                    FROM (
+                        SELECT
+                            d.roll_no,
+                            d.attendance_date,
+                            d.status,
+                            ROW_NUMBER() OVER (PARTITION BY d.roll_no ORDER BY d.attendance_date)
+                            - ROW_NUMBER() OVER (PARTITION BY d.roll_no, d.status ORDER BY d.attendance_date)
+                                AS island
+                        FROM daily_attendance d
+                        JOIN total_attendance t ON t.roll_no = d.roll_no
+                        WHERE d.attendance_date <= t.last_finalized
+                    ) AS numbered
+                    GROUP BY roll_no, status, island
+                ) AS runs
+            ) AS latest
+            WHERE total_attendance.roll_no = latest.roll_no
+              AND latest.recency = 1
+        """)
+        updated = cursor.rowcount
+    invalidate_totals()
+    return updated
@@ -1,42 +1,87 @@
+from django.conf import settings
 from django.urls import path
+from . import async_views
 from .views import (
     StudentListCreate,
     StudentDelete,
+    StudentHistory,
+    StudentImport,
     FinalizeAttendance,
+    FinalizeAttendanceRange,
     AbsentList,
     get_present_students,  # NEW: Import the new view
+    get_class_summary,
+    get_monthly_register,
+    export_register,
     mark_attendance,
+    mark_attendance_batch,
     get_device_commands,
     update_command_status,
     device_status,
     enroll_student,
     delete_fingerprint,
+    start_enrollment_campaign,
+    enrollment_campaign_status,
     check_command_status,
     get_devices,
+    get_dashboard,
     test_db,
 )
 
+# Under an ASGI server the scanner endpoints use their native async
+# versions.  The long-lived status stream is only offered there; under
+# WSGI it would hold a worker per open page, so the frontend polls.
+if settings.SERVE_ASGI:
+    device_views = {
+        'mark_attendance': async_views.mark_attendance,
+        'get_device_commands': async_views.get_device_commands,
+        'device_status': async_views.device_status,
+        'update_command_status': async_views.update_command_status,
+    }
+    stream_urls = [
+        path('command/status/<int:command_id>/stream/', async_views.stream_command_status, name='stream_command_status'),
+    ]
+else:
+    device_views = {
+        'mark_attendance': mark_attendance,
+        'get_device_commands': get_device_commands,
+        'device_status': device_status,
+        'update_command_status': update_command_status,
+    }
+    stream_urls = []
+
 urlpatterns = [
     # Student endpoints
     path('students/', StudentListCreate.as_view(), name='student_list_create'),
+    path('students/import/', StudentImport.as_view(), name='student_import'),
     path('students/<int:roll_no>/', StudentDelete.as_view(), name='student_delete'),
+    path('students/<int:roll_no>/history/', StudentHistory.as_view(), name='student_history'),
     
     # Attendance endpoints
     path('attendance/finalize/', FinalizeAttendance.as_view(), name='finalize_attendance'),
+    path('attendance/finalize/range/', FinalizeAttendanceRange.as_view(), name='finalize_attendance_range'),
     path('attendance/absent/', AbsentList.as_view(), name='absent_list'),
     path('attendance/present/', get_present_students, name='present_list'),  # NEW: Present students endpoint
+    path('attendance/summary/', get_class_summary, name='class_summary'),
+    path('attendance/register/', get_monthly_register, name='monthly_register'),
+    path('attendance/register/export/', export_register, name='export_register'),
     
     # Device endpoints (ESP32)
-    path('attendance/mark/', mark_attendance, name='mark_attendance'),
-    path('device/commands/', get_device_commands, name='get_device_commands'),
-    path('device/status/', device_status, name='device_status'),
-    path('device/command/update/', update_command_status, name='update_command_status'),
+    path('attendance/mark/', device_views['mark_attendance'], name='mark_attendance'),
+    path('attendance/mark/batch/', mark_attendance_batch, name='mark_attendance_batch'),
+    path('device/commands/', device_views['get_device_commands'], name='get_device_commands'),
+    path('device/status/', device_views['device_status'], name='device_status'),
+    path('device/command/update/', device_views['update_command_status'], name='update_command_status'),
     
     # Web UI endpoints
     path('student/enroll/', enroll_student, name='enroll_student'),
     path('student/delete-fingerprint/', delete_fingerprint, name='delete_fingerprint'),
+    path('enroll/campaign/', start_enrollment_campaign, name='start_enrollment_campaign'),
+    path('enroll/campaign/<int:campaign_id>/', enrollment_campaign_status, name='enrollment_campaign_status'),
     path('command/status/<int:command_id>/', check_command_status, name='check_command_status'),
+    *stream_urls,
     path('devices/', get_devices, name='get_devices'),
+    path('dashboard/', get_dashboard, name='dashboard'),
     
     # Testing
     path('test-db/', test_db, name='test_db'),
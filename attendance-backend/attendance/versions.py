@@ -0,0 +1,40 @@
+"""
+Version stamps shared between worker processes.
+
+A stamp is a counter kept in Django's cache.  Writers bump it, readers
+compare it with the value they last saw to know when their local copy
+is stale.  With the default LocMemCache this only covers one process;
+set REDIS_URL so every gunicorn worker sees the same stamps.
+"""
+
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+
+KEY_PREFIX = 'attendance:version:'
+
+
+def get_version(name):
+    key = KEY_PREFIX + name
+    version = cache.get(key)
+    if version is None:
+        # Seed from the clock so a cache restart never hands out an old value
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(name):
+    key = KEY_PREFIX + name
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns(), timeout=None)
+        return cache.get(key)
+
+
+def bump_version_on_commit(name):
+    """Bump once the current transaction commits, so readers see the new rows"""
+    transaction.on_commit(lambda: bump_version(name))
@@ -2,56 +2,132 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.decorators import api_view
-from django.db import connection
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, Q
+from django.http import HttpResponse, StreamingHttpResponse
 from django.utils import timezone
-from datetime import date
-
-from .models import Student, DailyAttendance, ParentDetail, Device, DeviceCommand, AttendanceLog
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils.decorators import method_decorator
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+from datetime import date, datetime, timezone as dt_timezone
+import hashlib
+import io
+import json
+
+from .models import Student, DailyAttendance, ParentDetail, Device, DeviceCommand, AttendanceLog, FingerprintSlot, EnrollmentCampaign, ClassDailySummary
 from .serializers import StudentSerializer
+from .scans import MAX_BATCH_SIZE, clean_device_id, mark_present, record_scan_batch
+from .fingerprints import fingerprint_cache
+from .presence import presence_tracker
+from .notifier import notifier
+from .queue import claim_next_commands, record_command_result
+from .slots import claim_slot, enrolled_slot
+from .campaigns import campaign_progress, start_campaign
+from .totals import finalize_day, finalize_range, mark_absentees, rebuild_totals
+from .summaries import refresh_summaries
+from .register import (
+    CompactedMonthError, absent_streaks, day_codes, month_bitmaps, month_end, percentage, register_day_sql
+)
+from .versions import get_version
+from .absences import absent_list_json
+from .exports import MAX_EXPORT_DAYS, register_csv
+from .history import MAX_HISTORY_DAYS, student_history
+from .roster import import_roster
+from .outbox import queue_absence_notices
+
+
+# Most commands a scanner may take in one poll (?limit=)
+MAX_COMMANDS_PER_POLL = 10
+
+# Latest scans on the dashboard (?recent=)
+DASHBOARD_RECENT_SCANS = 10
+MAX_DASHBOARD_RECENT_SCANS = 50
+
+
+def parse_date_param(params, name, default=None):
+    """
+    The date in params[name] (request.GET or request.data), or default
+    when it is absent.  Raises ValueError naming the parameter when it is
+    malformed or an impossible day such as 2026-02-30.
+    """
+    value = params.get(name)
+    if value in (None, ''):
+        return default
+    try:
+        day = parse_date(str(value))
+    except ValueError:
+        day = None
+    if day is None:
+        raise ValueError(f"{name} must be YYYY-MM-DD")
+    return day
 
 
 # ---------------- STUDENTS ----------------
 
+def student_list_etag(request, *args, **kwargs):
+    """Roster version plus the query, so a 304 needs no database access"""
+    if not settings.CONDITIONAL_GET:
+        return None
+    query = hashlib.md5(request.GET.urlencode().encode()).hexdigest()[:12]
+    return f"students-{get_version('students')}-{query}"
+
+
+STUDENT_LIST_FIELDS = ("roll_no", "student_name", "class_name", "fingerprint_id", "fingerprint_enrolled")
+
+# Largest page of the keyset-paginated student list
+MAX_STUDENT_PAGE = 500
+
+
 class StudentListCreate(APIView):
+    # no-cache: browsers revalidate with If-None-Match on every fetch
+    @method_decorator([cache_control(no_cache=True), condition(etag_func=student_list_etag)])
     def get(self, request):
+        """
+        Students ordered by roll_no, optionally filtered by ?class= and
+        ?enrolled=true|false.
+
+        ?limit=<n>[&after=<roll_no>] returns one keyset page plus the
+        `next_after` cursor; ?stream=jsonl streams every match as JSON
+        lines for exports.  Without either the whole list is returned.
+        """
+        students = Student.objects.order_by("roll_no")
+
+        class_name = request.GET.get("class")
+        if class_name:
+            students = students.filter(class_name=class_name)
+
+        enrolled = request.GET.get("enrolled")
+        if enrolled in ("true", "false"):
+            students = students.filter(fingerprint_enrolled=enrolled == "true")
+
+        rows = students.values(*STUDENT_LIST_FIELDS)
+
+        if request.GET.get("stream") == "jsonl":
+            lines = (json.dumps(row) + "\n" for row in rows.iterator(chunk_size=1000))
+            return StreamingHttpResponse(lines, content_type="application/x-ndjson")
+
+        if "limit" not in request.GET:
+            return Response(list(rows))
+
         try:
-            # Try to fetch students
-            students = Student.objects.all()
-            
-            # Check if query works
-            print(f"Found {students.count()} students")
-            
-            # Build response
-            data = []
-            for s in students:
-                try:
-                    data.append({
-                        "roll_no": s.roll_no,
-                        "student_name": s.student_name,
-                        "class_name": s.class_name,
-                        "fingerprint_id": s.fingerprint_id,
-                        "fingerprint_enrolled": s.fingerprint_enrolled
-                    })
-                except Exception as e:
-                    print(f"Error processing student {s.roll_no}: {str(e)}")
-                    # Skip problematic student
-                    continue
-            
-            return Response(data)
-            
-        except Exception as e:
-            # Log the actual error
-            import traceback
-            error_details = traceback.format_exc()
-            print(f"ERROR in StudentListCreate.get(): {str(e)}")
-            print(error_details)
-            
-            # Return error to frontend for debugging
-            return Response({
-                "error": str(e),
-                "details": error_details,
-                "message": "Failed to fetch students"
-            }, status=500)
+            limit = max(1, min(int(request.GET["limit"]), MAX_STUDENT_PAGE))
+            after = int(request.GET.get("after", 0))
+        except ValueError:
+            return Response(
+                {"error": "limit and after must be integers"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        page = list(rows.filter(roll_no__gt=after)[:limit + 1])
+        has_more = len(page) > limit
+        page = page[:limit]
+
+        return Response({
+            "results": page,
+            "next_after": page[-1]["roll_no"] if has_more else None
+        })
 
     def post(self, request):
         try:
@@ -75,136 +151,215 @@ class StudentDelete(APIView):
         return Response({"message": "Student deleted"})
 
 
+class StudentImport(APIView):
+    """Bulk roster import from an uploaded CSV (multipart field "file"); ?dry_run=1 only validates"""
+
+    def post(self, request):
+        upload = request.FILES.get("file")
+        if upload is None:
+            return Response(
+                {"error": "CSV file required in the 'file' field"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        dry_run = request.GET.get("dry_run") in ("true", "1")
+        stream = io.TextIOWrapper(upload.file, encoding="utf-8-sig", newline="")
+        try:
+            report = import_roster(stream, dry_run=dry_run)
+        except UnicodeDecodeError:
+            return Response(
+                {"error": "CSV must be UTF-8 encoded"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        if report["error_count"]:
+            return Response(report, status=status.HTTP_400_BAD_REQUEST)
+        return Response(report, status=status.HTTP_201_CREATED if report["committed"] else status.HTTP_200_OK)
+
+
+class StudentHistory(APIView):
+    """One student's daily statuses, first scans and running percentage (?from=&to=)"""
+
+    def get(self, request, roll_no):
+        student = Student.objects.filter(roll_no=roll_no).first()
+        if student is None:
+            return Response(
+                {"error": "Student not found"},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        try:
+            end = parse_date_param(request.GET, "to", timezone.localdate())
+            start = parse_date_param(request.GET, "from", end.replace(day=1))
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        if start > end:
+            return Response(
+                {"error": "from must not be after to"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if (end - start).days >= MAX_HISTORY_DAYS:
+            return Response(
+                {"error": f"at most {MAX_HISTORY_DAYS} days per history"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        return Response(student_history(student, start, end))
+
+
 # ---------------- ATTENDANCE ----------------
 
 class FinalizeAttendance(APIView):
     def post(self, request):
-        today = date.today()
+        today = timezone.localdate()
+
+        # Full recompute from the whole history, for repairing the totals
+        if request.data.get("rebuild") in (True, "true", "1", 1):
+            try:
+                with transaction.atomic():
+                    absent = mark_absentees(today)
+                    updated = rebuild_totals(today)
+                    refresh_summaries(date.min, today)
+            except CompactedMonthError as e:
+                return Response({"error": str(e)}, status=status.HTTP_409_CONFLICT)
+            return Response({
+                "message": "Attendance totals rebuilt",
+                "date": today,
+                "marked_absent": absent,
+                "students_updated": updated
+            })
 
-        with connection.cursor() as cursor:
-            # Mark all students who haven't scanned as absent
-            cursor.execute("""
-                INSERT INTO daily_attendance (roll_no, attendance_date, status)
-                SELECT roll_no, %s, 'A'
-                FROM student
-                WHERE roll_no NOT IN (
-                    SELECT roll_no FROM daily_attendance WHERE attendance_date = %s
-                )
-            """, [today, today])
-
-            # Update total_attendance table
-            cursor.execute("""
-                UPDATE total_attendance t
-                SET 
-                    present_days = (
-                        SELECT COUNT(*) FROM daily_attendance d 
-                        WHERE d.roll_no = t.roll_no AND d.status = 'P'
-                    ),
-                    absent_days = (
-                        SELECT COUNT(*) FROM daily_attendance d 
-                        WHERE d.roll_no = t.roll_no AND d.status = 'A'
-                    ),
-                    present_percentage = (
-                        SELECT ROUND(
-                            (COUNT(*) FILTER (WHERE status = 'P')::decimal / 
-                            NULLIF(COUNT(*), 0)) * 100, 2
-                        )
-                        FROM daily_attendance d 
-                        WHERE d.roll_no = t.roll_no
-                    )
-            """)
+        # Mark all students who haven't scanned as absent and add today's
+        # rows to the running totals
+        try:
+            absent, updated = finalize_day(today)
+        except CompactedMonthError as e:
+            return Response({"error": str(e)}, status=status.HTTP_409_CONFLICT)
+
+        # Parents are texted by the send_sms worker, not by this request
+        sms_queued = queue_absence_notices(today) if settings.SMS_QUEUE_ON_FINALIZE else 0
 
         return Response({
             "message": "Attendance finalized for today",
-            "date": today
+            "date": today,
+            "marked_absent": absent,
+            "students_updated": updated,
+            "sms_queued": sms_queued
         })
 
 
-class AbsentList(APIView):
-    def get(self, request):
-        date_param = request.GET.get("date", date.today())
-        class_name = request.GET.get("class")
+class FinalizeAttendanceRange(APIView):
+    def post(self, request):
+        today = timezone.localdate()
+        class_name = request.data.get("class") or None
 
-        query = """
-            SELECT
-                s.roll_no,
-                s.student_name,
-                s.class,
-                p.contact,
-                t.present_days,
-                t.absent_days,
-                t.continuous_absent
-            FROM student s
-            JOIN parent_detail p ON s.roll_no = p.roll_no
-            JOIN daily_attendance d ON s.roll_no = d.roll_no
-            LEFT JOIN total_attendance t ON s.roll_no = t.roll_no
-            WHERE d.attendance_date = %s
-              AND d.status = 'A'
-        """
-        params = [date_param]
+        try:
+            start = parse_date_param(request.data, "start")
+            end = parse_date_param(request.data, "end", today)
+        except ValueError:
+            start = end = None
+        if start is None:
+            return Response(
+                {"error": "start and end must be YYYY-MM-DD"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if start > end or end > today:
+            return Response(
+                {"error": "start must not be after end, and end not after today"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
 
-        if class_name:
-            query += " AND s.class = %s"
-            params.append(class_name)
+        try:
+            absent, updated = finalize_range(start, end, class_name)
+        except CompactedMonthError as e:
+            return Response({"error": str(e)}, status=status.HTTP_409_CONFLICT)
 
-        query += " ORDER BY t.continuous_absent DESC NULLS LAST"
+        return Response({
+            "message": "Attendance finalized for range",
+            "start": start,
+            "end": end,
+            "class": class_name,
+            "marked_absent": absent,
+            "students_updated": updated
+        })
 
-        with connection.cursor() as cursor:
-            cursor.execute(query, params)
-            rows = cursor.fetchall()
-
-        result = []
-        for r in rows:
-            msg = (
-                f"Dear Parent, Your child {r[1]} (Class {r[2]}) was absent on {date_param}. "
-                f"Total absences: {r[5] or 0}. "
-                f"Continuous absence: {r[6] or 0} days. "
-                f"Please ensure regular attendance."
-            )
 
-            result.append({
-                "roll_no": r[0],
-                "student_name": r[1],
-                "class_name": r[2],
-                "contact": r[3],
-                "present_days": r[4] or 0,
-                "absent_days": r[5] or 0,
-                "continuous_absent": r[6] or 0,
-                "message": msg
-            })
+class AbsentList(APIView):
+    def get(self, request):
+        class_name = request.GET.get("class")
 
-        return Response(result)
+        try:
+            day = parse_date_param(request.GET, "date", timezone.localdate())
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return HttpResponse(absent_list_json(day, class_name), content_type="application/json")
 
 
 # ============== NEW: PRESENT STUDENTS ENDPOINT ==============
 
+# Driven by daily_attendance_day_idx; the first scan comes from
+# attendancelog_day_idx on the stored attendance_date, one row per student
+PRESENT_LIST_SQL = """
+    SELECT
+        s.roll_no,
+        s.student_name,
+        s.class,
+        d.attendance_date,
+        (
+            SELECT MIN(al.timestamp)
+            FROM attendance_attendancelog al
+            WHERE al.roll_no = d.roll_no
+              AND al.attendance_date = d.attendance_date
+        ) AS first_scan
+    FROM daily_attendance d
+    JOIN student s ON s.roll_no = d.roll_no
+    WHERE d.attendance_date = %s
+      AND d.status = 'P'
+"""
+
+# Present on a day of a compacted month that only its register records
+REGISTER_PRESENT_LIST_SQL = """
+    SELECT
+        s.roll_no,
+        s.student_name,
+        s.class,
+        %s,
+        (
+            SELECT MIN(al.timestamp)
+            FROM attendance_attendancelog al
+            WHERE al.roll_no = s.roll_no
+              AND al.attendance_date = %s
+        ) AS first_scan
+    FROM student s
+    WHERE s.roll_no IN ({roll_nos})
+"""
+
+
 @api_view(['GET'])
 def get_present_students(request):
     """Get students who are present today (marked attendance)"""
-    date_param = request.GET.get("date", date.today())
     class_name = request.GET.get("class")
 
-    query = """
-        SELECT
-            s.roll_no,
-            s.student_name,
-            s.class,
-            d.attendance_date,
-            al.timestamp
-        FROM student s
-        JOIN daily_attendance d ON s.roll_no = d.roll_no
-        LEFT JOIN attendance_log al ON s.roll_no = al.student_id 
-            AND DATE(al.timestamp) = d.attendance_date
-        WHERE d.attendance_date = %s
-          AND d.status = 'P'
-    """
-    params = [date_param]
+    try:
+        day = parse_date_param(request.GET, "date", timezone.localdate())
+    except ValueError as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    pruned, pruned_params = register_day_sql(day, 'P', class_name)
+    query = PRESENT_LIST_SQL
+    params = [day]
 
     if class_name:
         query += " AND s.class = %s"
         params.append(class_name)
 
-    query += " ORDER BY s.class, s.roll_no"
+    query += " UNION ALL " + REGISTER_PRESENT_LIST_SQL.format(roll_nos=pruned)
+    params += [day, day, *pruned_params]
+
+    # class, roll_no
+    query += " ORDER BY 3, 1"
 
     with connection.cursor() as cursor:
         cursor.execute(query, params)
@@ -212,132 +367,272 @@ def get_present_students(request):
 
     result = []
     for r in rows:
+        first_scan = r[4]
+        if isinstance(first_scan, str):
+            # SQLite returns the aggregate as naive UTC text
+            first_scan = timezone.make_aware(parse_datetime(first_scan), dt_timezone.utc)
         result.append({
             "roll_no": r[0],
             "student_name": r[1],
             "class_name": r[2],
             "date": str(r[3]),
-            "time": r[4].strftime('%H:%M:%S') if r[4] else None
+            "time": timezone.localtime(first_scan).strftime('%H:%M:%S') if first_scan else None
         })
 
     return Response(result)
 
 
+@api_view(['GET'])
+def get_class_summary(request):
+    """Per-class present/absent/enrolled counts for a day (?date=) or range (?start=&end=)"""
+    class_name = request.GET.get("class")
+
+    try:
+        day = parse_date_param(request.GET, "date", timezone.localdate())
+        start = parse_date_param(request.GET, "start", day)
+        end = parse_date_param(request.GET, "end", day)
+    except ValueError as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    summaries = ClassDailySummary.objects.filter(attendance_date__range=(start, end))
+    if class_name:
+        summaries = summaries.filter(class_name=class_name)
+
+    return Response([
+        {
+            "class_name": row.class_name,
+            "date": str(row.attendance_date),
+            "present": row.present,
+            "absent": row.absent,
+            "enrolled": row.enrolled,
+        }
+        for row in summaries.order_by("attendance_date", "class_name")
+    ])
+
+
+@api_view(['GET'])
+def get_monthly_register(request):
+    """Register printout for a month (?month=YYYY-MM&class=), one row per student"""
+    month_param = request.GET.get("month")
+    class_name = request.GET.get("class")
+
+    if month_param:
+        try:
+            month = datetime.strptime(month_param, "%Y-%m").date()
+        except ValueError:
+            return Response(
+                {"error": "month must be YYYY-MM"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+    else:
+        month = timezone.localdate().replace(day=1)
+
+    bitmaps = month_bitmaps(month, class_name)
+    days_in_month = month_end(month).day
+
+    students = Student.objects.filter(roll_no__in=bitmaps).order_by("class_name", "roll_no")
+
+    result = []
+    for s in students:
+        present, absent, marked = bitmaps[s.roll_no]
+        longest, current = absent_streaks(absent, marked)
+        result.append({
+            "roll_no": s.roll_no,
+            "student_name": s.student_name,
+            "class_name": s.class_name,
+            "days": day_codes(present, absent, days_in_month),
+            "present_days": present.bit_count(),
+            "absent_days": absent.bit_count(),
+            "present_percentage": percentage(present, absent),
+            "longest_absence": longest,
+            "continuous_absent": current,
+        })
+
+    return Response({
+        "month": month.strftime("%Y-%m"),
+        "students": result
+    })
+
+
+@api_view(['GET'])
+def export_register(request):
+    """Stream the register for ?start=&end= (default: this month) and optional ?class= as CSV"""
+    today = timezone.localdate()
+    class_name = request.GET.get("class")
+
+    try:
+        start = parse_date_param(request.GET, "start", today.replace(day=1))
+        end = parse_date_param(request.GET, "end", today)
+    except ValueError as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    if start > end:
+        return Response(
+            {"error": "start must not be after end"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    if (end - start).days >= MAX_EXPORT_DAYS:
+        return Response(
+            {"error": f"at most {MAX_EXPORT_DAYS} days per export"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    filename = f"register_{class_name or 'all'}_{start}_{end}.csv".replace(" ", "_")
+    response = StreamingHttpResponse(register_csv(start, end, class_name), content_type="text/csv")
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
+
+
 # ============== FINGERPRINT DEVICE ENDPOINTS ==============
 
 @api_view(['POST'])
 def mark_attendance(request):
     """ESP32 calls this when fingerprint is scanned"""
+    if not isinstance(request.data, dict):
+        return Response({
+            'error': 'Request body must be a JSON object'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
     fingerprint_id = request.data.get('fingerprint_id')
-    device_id = request.data.get('device_id', 'FP001')
     
     if not fingerprint_id:
         return Response({
             'error': 'fingerprint_id required'
         }, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        device_id = clean_device_id(request.data.get('device_id', 'FP001'))
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
     
     try:
-        # Find student by fingerprint_id
-        student = Student.objects.get(fingerprint_id=fingerprint_id)
-        
-        # Get or create device
-        device, created = Device.objects.get_or_create(
-            device_id=device_id,
-            defaults={'name': f'Device {device_id}', 'status': 'online'}
-        )
-        
-        # Update device status
-        device.status = 'online'
-        device.last_seen = timezone.now()
-        device.save()
-        
-        # Check if already marked today
-        today = timezone.now().date()
-        
-        existing = DailyAttendance.objects.filter(
-            roll_no=student,
-            attendance_date=today
-        ).first()
-        
-        if existing:
-            return Response({
-                'message': 'Already marked present today',
-                'student': student.student_name,
-                'roll_no': student.roll_no,
-                'time': existing.attendance_date.strftime('%Y-%m-%d')
-            }, status=status.HTTP_200_OK)
-        
-        # Mark attendance
-        DailyAttendance.objects.create(
-            roll_no=student,
-            attendance_date=today,
-            status='P'
-        )
-        
-        # Log attendance
-        log = AttendanceLog.objects.create(
-            student=student,
-            device=device
-        )
-        
+        student = fingerprint_cache.resolve(device_id, fingerprint_id)
+    except (TypeError, ValueError):
+        return Response({
+            'error': 'fingerprint_id must be a number'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    if student is None:
+        return Response({
+            'error': f'No student found with fingerprint_id {fingerprint_id}'
+        }, status=status.HTTP_404_NOT_FOUND)
+
+    # Record device heartbeat
+    presence_tracker.touch(device_id)
+
+    # Mark and log in one atomic upsert; a concurrent duplicate scan is a no-op
+    now = timezone.now()
+    timestamp = mark_present(student.roll_no, device_id, now)
+
+    if timestamp is None:
         return Response({
-            'success': True,
-            'message': 'Attendance marked successfully',
+            'message': 'Already marked present today',
             'student': student.student_name,
             'roll_no': student.roll_no,
-            'class': student.class_name,
-            'timestamp': log.timestamp.isoformat() if log.timestamp else None
+            'time': timezone.localdate(now).strftime('%Y-%m-%d')
         }, status=status.HTTP_200_OK)
-        
-    except Student.DoesNotExist:
+
+    return Response({
+        'success': True,
+        'message': 'Attendance marked successfully',
+        'student': student.student_name,
+        'roll_no': student.roll_no,
+        'class': student.class_name,
+        'timestamp': timestamp.isoformat()
+    }, status=status.HTTP_200_OK)
+
+
+@api_view(['POST'])
+def mark_attendance_batch(request):
+    """ESP32 uploads buffered scans in one request"""
+    if not isinstance(request.data, dict):
         return Response({
-            'error': f'No student found with fingerprint_id {fingerprint_id}'
-        }, status=status.HTTP_404_NOT_FOUND)
+            'error': 'Request body must be a JSON object'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    scans = request.data.get('scans')
+
+    try:
+        device_id = clean_device_id(request.data.get('device_id', 'FP001'))
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    if not isinstance(scans, list) or not scans:
+        return Response({
+            'error': 'scans must be a non-empty list'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    if len(scans) > MAX_BATCH_SIZE:
+        return Response({
+            'error': f'At most {MAX_BATCH_SIZE} scans per batch'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    results = record_scan_batch(scans, default_device_id=device_id)
+
+    return Response({
+        'received': len(results),
+        'marked': sum(1 for r in results if r['status'] == 'marked'),
+        'results': results
+    }, status=status.HTTP_200_OK)
+
+
+def long_poll_seconds(request):
+    """Seconds a command poll may wait, from ?wait=, capped by settings"""
+    try:
+        wait = float(request.GET.get('wait', 0))
+    except ValueError:
+        return 0
+    return max(0, min(wait, settings.DEVICE_LONG_POLL_MAX_SECONDS))
+
+
+def command_limit(request):
+    """Commands to hand out per poll from ?limit=, or None for the single-command reply"""
+    try:
+        limit = int(request.GET['limit'])
+    except (KeyError, ValueError):
+        return None
+    return max(1, min(limit, MAX_COMMANDS_PER_POLL))
+
+
+def device_command_payload(command):
+    return {
+        'command': command.command_type,
+        'fingerprint_id': command.fingerprint_id,
+        'student_name': command.student.student_name,
+        'command_id': command.id
+    }
+
+
+def device_commands_response(commands, limit):
+    if limit is not None:
+        return {'commands': [device_command_payload(c) for c in commands]}
+    if commands:
+        return device_command_payload(commands[0])
+    return {'command': None}
 
 
 @api_view(['GET'])
 def get_device_commands(request):
-    """ESP32 polls this every 3 seconds"""
+    """
+    ESP32 polls this every 3 seconds.
+    
+    With ?limit=<n> up to n queued commands are handed out at once, as a
+    'commands' list.  ?wait=<seconds> long polling is only honoured by
+    the ASGI version (async_views.py); here it would hold a worker, so
+    the reply is immediate.
+    """
     device_id = request.GET.get('device_id')
     
     if not device_id:
         return Response({'error': 'device_id required'}, status=400)
     
     # Update device last_seen
-    device, created = Device.objects.get_or_create(
-        device_id=device_id,
-        defaults={'name': f'Device {device_id}', 'status': 'online'}
-    )
-    device.status = 'online'
-    device.last_seen = timezone.now()
-    device.save()
+    presence_tracker.touch(device_id)
     
-    # Get oldest pending command
-    command = DeviceCommand.objects.filter(
-        device=device,
-        status='pending'
-    ).order_by('created_at').first()
-    
-    if command:
-        # Check if expired
-        if command.is_expired():
-            command.status = 'expired'
-            command.message = 'Command timeout'
-            command.save()
-            return Response({'command': None})
-        
-        # Mark as in progress
-        command.status = 'in_progress'
-        command.save()
-        
-        return Response({
-            'command': command.command_type,
-            'fingerprint_id': command.fingerprint_id,
-            'student_name': command.student.student_name,
-            'command_id': command.id
-        })
+    limit = command_limit(request)
+    commands = claim_next_commands(device_id, limit or 1)
     
-    return Response({'command': None})
+    return Response(device_commands_response(commands, limit))
 
 
 @api_view(['POST'])
@@ -350,36 +645,9 @@ def update_command_status(request):
     if not command_id:
         return Response({'error': 'command_id required'}, status=400)
 
-    try:
-        command = DeviceCommand.objects.get(id=command_id)
-    except DeviceCommand.DoesNotExist:
+    if not record_command_result(command_id, result, message):
         return Response({'error': 'Command not found'}, status=404)
 
-    student = command.student
-
-    if result == 'success':
-        command.status = 'completed'
-        command.completed_at = timezone.now()
-        command.message = message or 'Operation successful'
-
-        if command.command_type == 'enroll':
-            student.fingerprint_enrolled = True
-            student.fingerprint_id = command.fingerprint_id
-        elif command.command_type == 'delete':
-            student.fingerprint_enrolled = False
-            student.fingerprint_id = None
-        
-        student.save()
-
-    elif result == 'error':
-        command.status = 'failed'
-        command.message = message or 'Operation failed'
-
-    elif result == 'in_progress':
-        command.status = 'in_progress'
-        command.message = message
-
-    command.save()
     return Response({'message': 'Status updated'})
 
 
@@ -390,15 +658,10 @@ def device_status(request):
     device_status_value = request.data.get('status', 'online')
     mode = request.data.get('mode', 'scanning')
     
-    device, created = Device.objects.get_or_create(
-        device_id=device_id,
-        defaults={'name': f'Device {device_id}'}
-    )
+    if not device_id:
+        return Response({'error': 'device_id required'}, status=400)
     
-    device.status = device_status_value
-    device.current_mode = mode
-    device.last_seen = timezone.now()
-    device.save()
+    presence_tracker.touch(device_id, status=device_status_value, mode=mode)
     
     return Response({'message': 'Status updated'}, status=200)
 
@@ -424,34 +687,30 @@ def enroll_student(request):
                 'error': 'Device offline. Please check connection.'
             }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
         
-        # Check if already enrolled
-        if student.fingerprint_enrolled:
-            return Response({
-                'error': f'Already enrolled (ID: {student.fingerprint_id})'
-            }, status=400)
-        
-        # Find next available ID
-        used_ids = Student.objects.filter(
-            fingerprint_id__isnull=False
-        ).values_list('fingerprint_id', flat=True)
-        
-        next_id = 1
-        while next_id in used_ids and next_id <= 127:
-            next_id += 1
-        
-        if next_id > 127:
+        # Check if already enrolled on this device
+        enrolled_id = enrolled_slot(device_id, student)
+        if enrolled_id is not None:
             return Response({
-                'error': 'No available slots (max 127)'
+                'error': f'Already enrolled (ID: {enrolled_id})'
             }, status=400)
         
-        # Create command
-        command = DeviceCommand.objects.create(
-            device=device,
-            student=student,
-            command_type='enroll',
-            fingerprint_id=next_id,
-            status='pending'
-        )
+        # Reserve a sensor slot and queue the command together
+        with transaction.atomic():
+            next_id = claim_slot(device_id, student)
+            
+            if next_id is None:
+                return Response({
+                    'error': f'No available slots (max {FingerprintSlot.CAPACITY})'
+                }, status=400)
+            
+            command = DeviceCommand.objects.create(
+                device=device,
+                student=student,
+                command_type='enroll',
+                fingerprint_id=next_id,
+                status='pending'
+            )
+            notifier.publish(f'device:{device_id}')
         
         return Response({
             'message': 'Enrollment started',
@@ -472,8 +731,9 @@ def delete_fingerprint(request):
     
     try:
         student = Student.objects.get(roll_no=roll_no)
+        slot = enrolled_slot(device_id, student)
         
-        if not student.fingerprint_enrolled or not student.fingerprint_id:
+        if slot is None:
             return Response({
                 'error': 'No fingerprint enrolled'
             }, status=400)
@@ -493,56 +753,221 @@ def delete_fingerprint(request):
             device=device,
             student=student,
             command_type='delete',
-            fingerprint_id=student.fingerprint_id,
+            fingerprint_id=slot,
             status='pending'
         )
+        notifier.publish(f'device:{device_id}')
         
         return Response({
             'message': 'Deletion command sent',
             'command_id': command.id,
-            'fingerprint_id': student.fingerprint_id
+            'fingerprint_id': slot
         }, status=status.HTTP_201_CREATED)
         
     except Student.DoesNotExist:
         return Response({'error': 'Student not found'}, status=404)
 
 
+@api_view(['POST'])
+def start_enrollment_campaign(request):
+    """Enroll class button: queue every unenrolled student of a class"""
+    class_name = request.data.get('class_name')
+    device_id = request.data.get('device_id', 'FP001')
+    
+    if not class_name:
+        return Response({'error': 'class_name required'}, status=400)
+    
+    device, created = Device.objects.get_or_create(
+        device_id=device_id,
+        defaults={'name': f'Device {device_id}'}
+    )
+    
+    # Check device online
+    if not device.is_online():
+        return Response({
+            'error': 'Device offline. Please check connection.'
+        }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+    
+    campaign, queued, skipped = start_campaign(device, class_name)
+    
+    if campaign is None:
+        if skipped:
+            return Response({
+                'error': f'No available slots (max {FingerprintSlot.CAPACITY})'
+            }, status=400)
+        return Response({
+            'error': f'No unenrolled students in class {class_name}'
+        }, status=400)
+    
+    return Response({
+        'message': 'Enrollment campaign started',
+        'campaign_id': campaign.id,
+        'queued': queued,
+        'skipped': skipped,
+        'instruction': 'Students place their finger on the scanner in roll number order'
+    }, status=status.HTTP_201_CREATED)
+
+
+@api_view(['GET'])
+def enrollment_campaign_status(request, campaign_id):
+    """Frontend polling: aggregate progress of a campaign"""
+    try:
+        campaign = EnrollmentCampaign.objects.get(id=campaign_id)
+    except EnrollmentCampaign.DoesNotExist:
+        return Response({'error': 'Campaign not found'}, status=404)
+    
+    return Response({
+        'campaign_id': campaign.id,
+        'class_name': campaign.class_name,
+        'device_id': campaign.device_id,
+        **campaign_progress(campaign)
+    })
+
+
+def command_status_payload(command):
+    return {
+        'status': command.status,
+        'message': command.message,
+        'student_name': command.student.student_name,
+        'fingerprint_id': command.fingerprint_id,
+        'command_type': command.command_type,
+        'created_at': command.created_at.isoformat() if command.created_at else None,
+        'updated_at': command.updated_at.isoformat() if command.updated_at else None,
+        'completed_at': command.completed_at.isoformat() if command.completed_at else None,
+    }
+
+
 @api_view(['GET'])
 def check_command_status(request, command_id):
     """Frontend polling"""
     try:
-        command = DeviceCommand.objects.get(id=command_id)
-        return Response({
-            'status': command.status,
-            'message': command.message,
-            'student_name': command.student.student_name,
-            'fingerprint_id': command.fingerprint_id,
-            'command_type': command.command_type,
-            'created_at': command.created_at.isoformat() if command.created_at else None,
-            'updated_at': command.updated_at.isoformat() if command.updated_at else None,
-            'completed_at': command.completed_at.isoformat() if command.completed_at else None,
-        })
+        command = DeviceCommand.objects.select_related('student').get(id=command_id)
+        return Response(command_status_payload(command))
     except DeviceCommand.DoesNotExist:
         return Response({'error': 'Command not found'}, status=404)
 
 
+_device_ids = {}
+
+
+def device_list_etag(request):
+    """
+    Weak validator for the device list: the device table's version plus
+    each device's presence as the list shows it.  Heartbeats that only
+    move last_seen within the online window do not change it.
+    """
+    if not settings.CONDITIONAL_GET:
+        return None
+    version = get_version('devices')
+    device_ids = _device_ids.get(version)
+    if device_ids is None:
+        device_ids = list(Device.objects.order_by('pk').values_list('device_id', flat=True))
+        _device_ids.clear()
+        _device_ids[version] = device_ids
+
+    presence = [
+        (Device.seen_recently(entry[0]), entry[1], entry[2]) if entry else None
+        for entry in presence_tracker.entries(device_ids)
+    ]
+    digest = hashlib.md5(repr(presence).encode()).hexdigest()[:12]
+    return f'W/"devices-{version}-{digest}"'
+
+
 @api_view(['GET'])
+@cache_control(no_cache=True)
+@condition(etag_func=device_list_etag)
 def get_devices(request):
     """Device list"""
-    devices = Device.objects.all()
+    return Response(device_list_data(Device.objects.all()))
+
+
+def device_list_data(devices):
+    """Device list entries with unflushed heartbeats applied"""
+    presence = presence_tracker.snapshots(devices)
     data = []
 
     for device in devices:
+        last_seen, device_status_value, mode = presence[device.device_id]
         data.append({
             'device_id': device.device_id,
             'name': device.name,
-            'status': device.status,
-            'is_online': device.is_online(),
-            'current_mode': device.current_mode,
-            'last_seen': device.last_seen.isoformat() if device.last_seen else None
+            'status': device_status_value,
+            'is_online': Device.seen_recently(last_seen),
+            'current_mode': mode,
+            'last_seen': last_seen.isoformat() if last_seen else None
         })
 
-    return Response(data)
+    return data
+
+
+# ============== DASHBOARD ==============
+
+@api_view(['GET'])
+def get_dashboard(request):
+    """
+    Everything the dashboard shows for a day (?date=, default today) in
+    one response: totals, per-class counts, devices and the ?recent=
+    latest scans.  Four small queries, none of them a full list.
+    """
+    try:
+        day = parse_date_param(request.GET, "date", timezone.localdate())
+    except ValueError as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        recent = min(max(int(request.GET.get("recent", DASHBOARD_RECENT_SCANS)), 0), MAX_DASHBOARD_RECENT_SCANS)
+    except ValueError:
+        recent = DASHBOARD_RECENT_SCANS
+
+    classes = {
+        row['class_name']: {
+            'class_name': row['class_name'],
+            'students': row['students'],
+            'enrolled': row['enrolled'],
+            'present': 0,
+            'absent': 0,
+        }
+        for row in Student.objects.values('class_name').annotate(
+            students=Count('roll_no'),
+            enrolled=Count('roll_no', filter=Q(fingerprint_enrolled=True))
+        ).order_by('class_name')
+    }
+
+    # Present counts move with every scan; absent ones once the day is finalized
+    for summary in ClassDailySummary.objects.filter(attendance_date=day):
+        row = classes.get(summary.class_name)
+        if row is not None:
+            row['present'] = summary.present
+            row['absent'] = summary.absent
+
+    devices = device_list_data(Device.objects.all())
+
+    scans = AttendanceLog.objects.select_related('student').order_by('-timestamp')[:recent]
+
+    totals = {
+        field: sum(row[field] for row in classes.values())
+        for field in ('students', 'enrolled', 'present', 'absent')
+    }
+
+    return Response({
+        'date': str(day),
+        'totals': totals,
+        'classes': list(classes.values()),
+        'devices': {
+            'total': len(devices),
+            'online': sum(device['is_online'] for device in devices),
+            'list': devices,
+        },
+        'recent_scans': [
+            {
+                'roll_no': log.student_id,
+                'student_name': log.student.student_name,
+                'class_name': log.student.class_name,
+                'device_id': log.device_id,
+                'timestamp': log.timestamp.isoformat(),
+            }
+            for log in scans
+        ],
+    })
 
 
 @api_view(['GET'])
@@ -14,3 +14,19 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
 
 application = get_asgi_application()
+
+from django.conf import settings  # noqa: E402
+from django.contrib.staticfiles.handlers import ASGIStaticFilesHandler  # noqa: E402
+
+# Stands in for WhiteNoise, whose middleware is dropped under ASGI
+if settings.SERVE_ASGI:
+    application = ASGIStaticFilesHandler(application)
+
+# Load the fingerprint -> student map before the first scan arrives. ASGI
+# servers import this module inside the event loop, where the ORM refuses
+# to run, so the load happens in a thread.
+import threading  # noqa: E402
+
+from attendance.fingerprints import warm_fingerprint_cache  # noqa: E402
+
+threading.Thread(target=warm_fingerprint_cache, daemon=True).start()
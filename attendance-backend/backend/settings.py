@@ -34,6 +34,12 @@ DEBUG = os.getenv("DEBUG", "True") == "True"
 # Allow all hosts for now (lock later)
 ALLOWED_HOSTS = ["*"]
 
+# Set when running backend.asgi under an ASGI server, e.g.
+#   gunicorn backend.asgi:application -k uvicorn.workers.UvicornWorker
+# Device endpoints then use their async views, and persistent database
+# connections (not safe under ASGI) are turned off.
+SERVE_ASGI = os.getenv("SERVE_ASGI", "False") == "True"
+
 
 # =========================
 # APPLICATION DEFINITION
@@ -67,6 +73,11 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# WhiteNoise's middleware is sync-only; under ASGI it would pin a thread to
+# every request, so static files are served by backend.asgi instead
+if SERVE_ASGI:
+    MIDDLEWARE.remove('whitenoise.middleware.WhiteNoiseMiddleware')
+
 ROOT_URLCONF = 'backend.urls'
 
 TEMPLATES = [
@@ -95,12 +106,73 @@ WSGI_APPLICATION = 'backend.wsgi.application'
 DATABASES = {
     'default': dj_database_url.config(
         default=os.environ.get('DATABASE_URL', f"sqlite:///{BASE_DIR / 'db.sqlite3'}"),
-        conn_max_age=600,
+        conn_max_age=0 if SERVE_ASGI else 600,
         conn_health_checks=True,
     )
 }
 
 
+# =========================
+# CACHE CONFIGURATION
+# =========================
+# Local memory per process by default; Redis shares caches between workers
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+if os.getenv("REDIS_URL"):
+    CACHES['default'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.getenv("REDIS_URL"),
+    }
+
+# ETags on the roster and device lists come from the version stamps, which
+# must be shared by every worker: on by default only with Redis.  A single
+# process may enable it with the local memory cache.
+CONDITIONAL_GET = os.getenv(
+    "CONDITIONAL_GET", "True" if os.getenv("REDIS_URL") else "False"
+) == "True"
+
+# Ready-built reports (absent lists, history months) are kept in the cache
+# under the same version stamps: likewise on by default only with Redis,
+# since a worker would otherwise miss another worker's invalidations
+REPORT_CACHE = os.getenv(
+    "REPORT_CACHE", "True" if os.getenv("REDIS_URL") else "False"
+) == "True"
+
+# Upper bound (seconds) on how stale a worker's fingerprint map may get
+FINGERPRINT_CACHE_MAX_AGE = int(os.getenv("FINGERPRINT_CACHE_MAX_AGE", "300"))
+
+# How often (seconds) buffered device heartbeats are written to the Device table
+DEVICE_PRESENCE_FLUSH_SECONDS = int(os.getenv("DEVICE_PRESENCE_FLUSH_SECONDS", "30"))
+
+# Longest a scanner's ?wait= command poll is held open (ASGI only); must stay under the
+# 60 s online window so a long-polling device never looks offline
+DEVICE_LONG_POLL_MAX_SECONDS = int(os.getenv("DEVICE_LONG_POLL_MAX_SECONDS", "25"))
+
+# Longest a command status event stream stays open (commands expire at 300 s)
+COMMAND_STREAM_MAX_SECONDS = int(os.getenv("COMMAND_STREAM_MAX_SECONDS", "330"))
+
+# Weekdays (Monday = 0) that range finalize treats as school days
+SCHOOL_WEEKDAYS = [
+    int(day) for day in os.getenv("SCHOOL_WEEKDAYS", "0,1,2,3,4,5").split(",")
+]
+
+# Parent SMS (see attendance/outbox.py).  Finalize queues the day's absence
+# notices; `manage.py send_sms` sends them through SMS_GATEWAY, a dotted path
+# to an attendance.sms.SmsGateway subclass.
+SMS_QUEUE_ON_FINALIZE = os.getenv("SMS_QUEUE_ON_FINALIZE", "True") == "True"
+SMS_GATEWAY = os.getenv("SMS_GATEWAY", "attendance.sms.ConsoleGateway")
+SMS_FILE_PATH = os.getenv("SMS_FILE_PATH", str(BASE_DIR / "sms_outbox.jsonl"))
+SMS_RATE_PER_SECOND = int(os.getenv("SMS_RATE_PER_SECOND", "10"))
+SMS_CONCURRENCY = int(os.getenv("SMS_CONCURRENCY", "4"))
+SMS_BATCH_SIZE = int(os.getenv("SMS_BATCH_SIZE", "100"))
+SMS_MAX_ATTEMPTS = int(os.getenv("SMS_MAX_ATTEMPTS", "5"))
+
+
 # =========================
 # PASSWORD VALIDATION
 # =========================
@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
 
 application = get_wsgi_application()
+
+# Load the fingerprint -> student map before the first scan arrives
+from attendance.fingerprints import warm_fingerprint_cache  # noqa: E402
+
+warm_fingerprint_cache()
@@ -90,7 +90,8 @@ export default function AttendanceSystem() {
   const [students, setStudents] = useState([]);
   const [absentStudents, setAbsentStudents] = useState([]);
   const [presentStudents, setPresentStudents] = useState([]);
-  const [devices, setDevices] = useState([]);
+  const [classSummary, setClassSummary] = useState(null);
+  const [dashboard, setDashboard] = useState(null);
   const [loading, setLoading] = useState(false);
   const [notification, setNotification] = useState(null);
   const [menuOpen, setMenuOpen] = useState(false);
@@ -117,8 +118,7 @@ export default function AttendanceSystem() {
 
   useEffect(() => {
     if (isAuthenticated) {
-      fetchStudents();
-      fetchDevices();
+      fetchDashboard();
     }
   }, [isAuthenticated]);
 
@@ -171,36 +171,39 @@ export default function AttendanceSystem() {
       setLoading(true);
       const today = new Date().toISOString().split('T')[0];
       const response = await fetch(`${API_URL}/attendance/present/?date=${today}`);
-      
-      if (response.ok) {
-        const data = await response.json();
-        setPresentStudents(data);
-      } else {
-        // Fallback: calculate from enrolled students
-        const enrolledStudents = students.filter(s => s.fingerprint_enrolled);
-        setPresentStudents(enrolledStudents.map(s => ({
-          roll_no: s.roll_no,
-          student_name: s.student_name,
-          class_name: s.class_name
-        })));
-      }
+      if (!response.ok) throw new Error('Failed to fetch');
+      const data = await response.json();
+      setPresentStudents(data);
     } catch (error) {
       showNotification('Failed to load present students', 'error');
+      setPresentStudents([]);
       console.error('Fetch error:', error);
     } finally {
       setLoading(false);
     }
   };
 
-  const fetchDevices = async () => {
+  const fetchClassSummary = async () => {
     try {
-      const response = await fetch(`${API_URL}/devices/`);
-      if (response.ok) {
-        const data = await response.json();
-        setDevices(data);
-      }
+      const today = new Date().toISOString().split('T')[0];
+      const response = await fetch(`${API_URL}/attendance/summary/?date=${today}`);
+      if (!response.ok) throw new Error('Failed to fetch');
+      setClassSummary(await response.json());
     } catch (error) {
-      console.error('Failed to load devices:', error);
+      // Fall back to counting the loaded lists
+      setClassSummary(null);
+      console.error('Fetch error:', error);
+    }
+  };
+
+  const fetchDashboard = async () => {
+    try {
+      const response = await fetch(`${API_URL}/dashboard/`);
+      if (!response.ok) throw new Error('Failed to fetch');
+      setDashboard(await response.json());
+    } catch (error) {
+      showNotification('Failed to load dashboard. Please check backend connection.', 'error');
+      console.error('Fetch error:', error);
     }
   };
 
@@ -225,6 +228,7 @@ export default function AttendanceSystem() {
           address: ''
         });
         fetchStudents();
+        fetchDashboard();
       } else {
         const error = await response.json();
         showNotification(error.error || 'Failed to add student', 'error');
@@ -271,6 +275,7 @@ export default function AttendanceSystem() {
       if (response.ok) {
         showNotification('Student deleted successfully');
         fetchStudents();
+        fetchDashboard();
       } else {
         showNotification('Failed to delete student', 'error');
       }
@@ -293,6 +298,8 @@ export default function AttendanceSystem() {
       if (response.ok) {
         showNotification('Attendance finalized successfully!');
         fetchAbsentStudents();
+        fetchClassSummary();
+        fetchDashboard();
       } else {
         showNotification('Failed to finalize attendance', 'error');
       }
@@ -351,8 +358,14 @@ export default function AttendanceSystem() {
     return filtered;
   };
 
-  const getClassWiseCount = (studentList) => {
+  const getClassWiseCount = (studentList, field) => {
     const counts = {};
+    if (classSummary) {
+      classSummary.forEach(row => {
+        counts[row.class_name] = row[field];
+      });
+      return counts;
+    }
     classes.forEach(c => {
       counts[c] = studentList.filter(s => s.class_name === c).length;
     });
@@ -363,13 +376,13 @@ export default function AttendanceSystem() {
     return <LoginPage onLogin={() => setIsAuthenticated(true)} />;
   }
 
-  const totalStudents = students.length;
-  const enrolledStudents = students.filter(s => s.fingerprint_enrolled).length;
-  const onlineDevices = devices.filter(d => d.is_online).length;
+  const totalStudents = dashboard ? dashboard.totals.students : students.length;
+  const enrolledStudents = dashboard ? dashboard.totals.enrolled : students.filter(s => s.fingerprint_enrolled).length;
+  const onlineDevices = dashboard ? dashboard.devices.online : 0;
   const filteredAbsent = filterStudents(absentStudents);
   const filteredPresent = filterStudents(presentStudents);
-  const absentClassCounts = getClassWiseCount(absentStudents);
-  const presentClassCounts = getClassWiseCount(presentStudents);
+  const absentClassCounts = getClassWiseCount(absentStudents, 'absent');
+  const presentClassCounts = getClassWiseCount(presentStudents, 'present');
 
   const NavItem = ({ icon: Icon, label, page }) => (
     <button
@@ -378,8 +391,11 @@ export default function AttendanceSystem() {
         setMenuOpen(false);
         setSearchTerm('');
         setSelectedClass('all');
+        if (page === 'dashboard' || page === 'finalize') fetchDashboard();
+        if (page === 'students') fetchStudents();
         if (page === 'absent') fetchAbsentStudents();
         if (page === 'present') fetchPresentStudents();
+        if (page === 'absent' || page === 'present') fetchClassSummary();
       }}
       className={`w-full flex items-center gap-3 px-4 py-3 rounded-lg transition-all ${
         currentPage === page 
@@ -542,9 +558,31 @@ export default function AttendanceSystem() {
                           <span className="text-gray-600">Enrolled</span>
                           <span className="font-medium">{enrolledStudents}</span>
                         </div>
+                        <div className="flex justify-between items-center">
+                          <span className="text-gray-600">Present</span>
+                          <span className="font-medium text-green-700">{dashboard ? dashboard.totals.present : 0}</span>
+                        </div>
+                        <div className="flex justify-between items-center">
+                          <span className="text-gray-600">Absent</span>
+                          <span className="font-medium text-red-700">{dashboard ? dashboard.totals.absent : 0}</span>
+                        </div>
                       </div>
                     </div>
                   </div>
+
+                  {dashboard && dashboard.recent_scans.length > 0 && (
+                    <div className="border rounded-xl p-6">
+                      <h3 className="text-lg font-semibold mb-4 text-gray-800">Recent Scans</h3>
+                      <div className="space-y-3">
+                        {dashboard.recent_scans.map((scan) => (
+                          <div key={`${scan.roll_no}-${scan.timestamp}`} className="flex justify-between items-center">
+                            <span className="text-gray-600">{scan.student_name} ({scan.class_name})</span>
+                            <span className="font-medium">{new Date(scan.timestamp).toLocaleTimeString()}</span>
+                          </div>
+                        ))}
+                      </div>
+                    </div>
+                  )}
                 </div>
               )}
 
@@ -750,7 +788,7 @@ export default function AttendanceSystem() {
                         Download CSV
                       </button>
                       <button 
-                        onClick={fetchPresentStudents}
+                        onClick={() => { fetchPresentStudents(); fetchClassSummary(); }}
                         disabled={loading}
                         className="flex items-center gap-2 px-4 py-2 text-blue-600 hover:bg-blue-50 rounded-lg disabled:opacity-50"
                       >
@@ -865,7 +903,7 @@ export default function AttendanceSystem() {
                         Download CSV
                       </button>
                       <button 
-                        onClick={fetchAbsentStudents}
+                        onClick={() => { fetchAbsentStudents(); fetchClassSummary(); }}
                         disabled={loading}
                         className="flex items-center gap-2 px-4 py-2 text-blue-600 hover:bg-blue-50 rounded-lg disabled:opacity-50"
                       >
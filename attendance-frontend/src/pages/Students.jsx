@@ -90,7 +90,7 @@ export default function Students() {
         [rollNo]: `👆 ${response.data.instruction} (ID: ${response.data.fingerprint_id})`
       }));
       
-      pollCommandStatus(rollNo, response.data.command_id);
+      watchCommandStatus(rollNo, response.data.command_id);
       
     } catch (error) {
       const errorMsg = error.response?.data?.error || error.message;
@@ -113,7 +113,7 @@ export default function Students() {
       });
       
       setStatusMessage(prev => ({ ...prev, [rollNo]: "⏳ Deleting..." }));
-      pollCommandStatus(rollNo, response.data.command_id);
+      watchCommandStatus(rollNo, response.data.command_id);
       
     } catch (error) {
       const errorMsg = error.response?.data?.error || error.message;
@@ -124,6 +124,40 @@ export default function Students() {
     }
   };
 
+  // Returns true once the command has finished
+  const showCommandStatus = (rollNo, data) => {
+    if (data.status === 'completed') {
+      setStatusMessage(prev => ({
+        ...prev,
+        [rollNo]: `✅ Success! ${data.message}`
+      }));
+
+      setTimeout(() => {
+        loadStudents();
+        setStatusMessage(prev => ({ ...prev, [rollNo]: "" }));
+      }, 2000);
+      return true;
+
+    } else if (data.status === 'failed' || data.status === 'expired') {
+      setStatusMessage(prev => ({
+        ...prev,
+        [rollNo]: `❌ Failed: ${data.message}`
+      }));
+
+      setTimeout(() => {
+        setStatusMessage(prev => ({ ...prev, [rollNo]: "" }));
+      }, 5000);
+      return true;
+
+    } else if (data.status === 'in_progress') {
+      setStatusMessage(prev => ({
+        ...prev,
+        [rollNo]: `⏳ ${data.message || 'Processing...'}`
+      }));
+    }
+    return false;
+  };
+
   const pollCommandStatus = (rollNo, commandId) => {
     let attempts = 0;
     const maxAttempts = 60;
@@ -132,37 +166,11 @@ export default function Students() {
       attempts++;
       
       try {
-        const response = await api.get(`/command/${commandId}/`);
-        const data = response.data;
+        const response = await api.get(`/command/status/${commandId}/`);
         
-        if (data.status === 'completed') {
-          clearInterval(interval);
-          setStatusMessage(prev => ({
-            ...prev,
-            [rollNo]: `✅ Success! ${data.message}`
-          }));
-          
-          setTimeout(() => {
-            loadStudents();
-            setStatusMessage(prev => ({ ...prev, [rollNo]: "" }));
-          }, 2000);
-          
-        } else if (data.status === 'failed' || data.status === 'expired') {
+        if (showCommandStatus(rollNo, response.data)) {
           clearInterval(interval);
-          setStatusMessage(prev => ({
-            ...prev,
-            [rollNo]: `❌ Failed: ${data.message}`
-          }));
-          
-          setTimeout(() => {
-            setStatusMessage(prev => ({ ...prev, [rollNo]: "" }));
-          }, 5000);
-          
-        } else if (data.status === 'in_progress') {
-          setStatusMessage(prev => ({
-            ...prev,
-            [rollNo]: `⏳ ${data.message || 'Processing...'}`
-          }));
+          return;
         }
         
         if (attempts >= maxAttempts) {
@@ -179,6 +187,33 @@ export default function Students() {
     }, 2000);
   };
 
+  const watchCommandStatus = (rollNo, commandId) => {
+    // The stream is only served under ASGI; otherwise poll
+    if (typeof EventSource === 'undefined') {
+      pollCommandStatus(rollNo, commandId);
+      return;
+    }
+
+    const source = new EventSource(`${api.defaults.baseURL}/command/status/${commandId}/stream/`);
+    let finished = false;
+
+    source.addEventListener('status', (event) => {
+      if (showCommandStatus(rollNo, JSON.parse(event.data))) {
+        finished = true;
+        source.close();
+      }
+    });
+
+    // A missing stream (404 under WSGI), a dropped connection or the
+    // server's timeout all end here; polling picks up where it left off
+    source.onerror = () => {
+      source.close();
+      if (!finished) {
+        pollCommandStatus(rollNo, commandId);
+      }
+    };
+  };
+
   return (
     <div className="container-fluid mt-4 px-4">
       {/* Device Status */}